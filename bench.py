@@ -0,0 +1,275 @@
+"""Headless engine benchmark.
+
+Loads a map, spawns slimes around a scripted Tux and runs a fixed number
+of ticks without a window, then reports throughput, time spent per phase
+and peak memory. The run is seeded, so two runs of the same commit do the
+same work. Throughput is timed with the profiler off; the phases come
+from a second, profiled run of the same ticks:
+
+    python bench.py res/map/test_for_PGE.json --slimes 100 --ticks 1000
+
+With --bullets N, N short-lived bullets are also fired from Tux every
+tick, to measure the cost of spawning and destroying actors.
+
+With --actor-memory it instead reports the bytes allocated per instance of
+each actor class.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+os.environ.setdefault("DIM_TROUBLE_HEADLESS", "1")
+
+import pygame
+
+from src.actors import *
+from src.game import *
+from src.globals import *
+from src.profiler import profiler
+
+
+def scripted_keys(tick):
+    """Keyboard state for the scripted Tux: walk right and left in turns."""
+    keys = defaultdict(bool)
+    keys[RIGHT if (tick // 120) % 2 == 0 else LEFT] = True
+    return keys
+
+
+def free_spots(rng, count, width, height):
+    spots = []
+    while len(spots) < count:
+        x = rng.randrange(0, width - 16)
+        y = rng.randrange(0, height - 16)
+        if not collision_check(pygame.Rect(x, y, 16, 16)):
+            spots.append((x, y))
+    return spots
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def setup(map_path, slimes, seed):
+    """Load the map and spawn Tux and the slimes; returns the map, the
+    random generator of the run and the tick counter Tux is driven by."""
+    game_map = GameMap(map_path)
+    game_map.draw_tiles()
+
+    tick = [0]
+    new_actor(Tux, 160, 160, None, "actorlayer")
+    game.game_player.autocon = lambda tux: scripted_keys(tick[0])
+    update_camera()
+
+    rng = random.Random(seed)
+    width = game_map.mapdata["width"] * game_map.mapdata["tilewidth"]
+    height = game_map.mapdata["height"] * game_map.mapdata["tileheight"]
+    for x, y in free_spots(rng, slimes, width, height):
+        new_actor(Slime, x, y, None, "actorlayer")
+
+    return game_map, rng, tick
+
+
+def simulate(ticks, rng, tick, render, bullets):
+    for tick[0] in range(ticks):
+        if tick[0] % 90 == 0:
+            game.game_player.jump()
+
+        for _ in range(bullets):
+            angle = rng.uniform(0, 2 * math.pi)
+            new_actor(
+                Bullet,
+                game.game_player.x + 8,
+                game.game_player.y + 8,
+                [math.cos(angle) * 3, math.sin(angle) * 3, 60],
+                "actorlayer",
+            )
+
+        game_update()
+
+        if render:
+            display.fill(BLACK)
+            game_render()
+
+        profiler.end_frame()
+
+
+def run(
+    map_path,
+    slimes=50,
+    ticks=600,
+    seed=0,
+    render=True,
+    trace_memory=False,
+    bullets=0,
+):
+    profiler.reset()
+    profiler.enabled = profiler.record = False
+    if trace_memory:
+        # tracemalloc slows everything down, so timings of such runs are
+        # only good for comparing with each other
+        tracemalloc.start()
+
+    reset_game()
+    start = time.perf_counter()
+    _, rng, tick = setup(map_path, slimes, seed)
+    map_load = time.perf_counter() - start
+
+    # timed with the profiler off, so its own timing calls aren't counted
+    start = time.perf_counter()
+    simulate(ticks, rng, tick, render, bullets)
+    elapsed = time.perf_counter() - start
+    live_actors = len(game.actor["actorlayer"])
+
+    peak_heap = None
+    if trace_memory:
+        peak_heap = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+    # the phase breakdown comes from a second, profiled run of the same
+    # seeded work, from a clean slate: no actors, pools or ids left over
+    reset_game()
+    _, rng, tick = setup(map_path, slimes, seed)
+    profiler.reset()
+    profiler.enabled = profiler.record = True
+    try:
+        simulate(ticks, rng, tick, render, bullets)
+    finally:
+        profiler.enabled = profiler.record = False
+
+    totals = profiler.totals()
+    phases = {"map load": map_load * 1000}
+    # collision queries happen inside the update pass
+    phases["update"] = totals.get("update", 0.0) - totals.get("collision", 0.0)
+    for phase in ("collision", "contacts", "camera", "render"):
+        phases[phase] = totals.get(phase, 0.0)
+
+    return {
+        "map": map_path,
+        "slimes": slimes,
+        "bullets": bullets,
+        "ticks": ticks,
+        "ticks_per_sec": ticks / elapsed,
+        "phases_ms": {
+            phase: {
+                "total": total,
+                "per_tick": total / (1 if phase == "map load" else ticks),
+            }
+            for phase, total in phases.items()
+        },
+        "collision_queries": profiler.calls["collision"],
+        "live_actors": live_actors,
+        "peak_rss_kb": peak_rss_kb(),
+        "peak_heap_kb": peak_heap,
+    }
+
+
+def actor_memory(count=1000):
+    """Bytes allocated per actor, by actor class, averaged over `count` instances."""
+    actor_types = [
+        (Sprite, [sprite("marbel"), 0]),
+        (Block, [0]),
+        (Slime, None),
+        (Tux, None),
+        (VerticallyMovingBlock, None),
+        (HorizontallyMovingBlock, None),
+    ]
+    sizes = {}
+
+    for actor_type, arr in actor_types:
+        # build one first so shared, lazily built state is not counted
+        actor_type(0, 0, arr)
+        gc.collect()
+
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        actors = [actor_type(i, i, arr) for i in range(count)]
+        sizes[actor_type.__name__] = (tracemalloc.get_traced_memory()[0] - start) / count
+        tracemalloc.stop()
+
+        del actors
+
+    return sizes
+
+
+def report(result):
+    print(f"map            {result['map']}")
+    print(f"slimes         {result['slimes']}")
+    print(f"bullets/tick   {result['bullets']}")
+    print(f"ticks          {result['ticks']}")
+    print(f"ticks/sec      {result['ticks_per_sec']:.1f}")
+    for phase, times in result["phases_ms"].items():
+        print(
+            f"{phase:<14} {times['total']:9.2f} ms total  "
+            f"{times['per_tick']:7.3f} ms/tick"
+        )
+    print(f"collisions     {result['collision_queries']} queries")
+    print(f"live actors    {result['live_actors']}")
+    if result["peak_rss_kb"] is not None:
+        print(f"peak RSS       {result['peak_rss_kb']} KiB")
+    if result["peak_heap_kb"] is not None:
+        print(f"peak heap      {result['peak_heap_kb']:.0f} KiB (tracemalloc)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("map", nargs="?", default="res/map/test_for_PGE.json")
+    parser.add_argument("--slimes", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--bullets", type=int, default=0, help="bullets fired per tick"
+    )
+    parser.add_argument("--no-render", action="store_true")
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="also measure the peak Python heap (slows the run down)",
+    )
+    parser.add_argument(
+        "--actor-memory",
+        action="store_true",
+        help="report bytes per actor instead of running the map",
+    )
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    if args.actor_memory:
+        sizes = actor_memory()
+        if args.json:
+            print(json.dumps(sizes, indent=2))
+        else:
+            for name, size in sizes.items():
+                print(f"{name:<24} {size:8.0f} bytes/actor")
+        return
+
+    result = run(
+        args.map,
+        args.slimes,
+        args.ticks,
+        args.seed,
+        not args.no_render,
+        args.trace_memory,
+        args.bullets,
+    )
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,114 @@
+import gc
+import os
+
 import pygame
 
 from src.actors import *
+from src.assets import assets
 from src.game import *
 from src.globals import *
+from src.lang import lang
+from src.profiler import profiler
+
+
+def loading_screen():
+    """Show a progress bar while the registered assets load in the background."""
+    assets.preload()
+
+    while not assets.done:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+
+        progress = assets.poll()
+
+        display.fill(BLACK)
+        pygame.draw.rect(display, WHITE, (40, DISP_HEI / 2 - 4, DISP_WID - 80, 8), 1)
+        pygame.draw.rect(
+            display, WHITE, (40, DISP_HEI / 2 - 4, (DISP_WID - 80) * progress, 8)
+        )
+        pygame.display.update()
+        clock.tick(FPS)
+
+    return True
 
 
 def start_game():
-    game.game_mode = game_play
+    # pick the language here, on the main thread, before anything (e.g. the
+    # dialog renderer's worker) looks strings up
+    lang.use(lang.default)
+
+    if not loading_screen():
+        return
+
+    game.game_mode = game_update
+    game.render_mode = game_render
     p = GameMap("res/map/test_for_PGE.json")
     p.draw_tiles()
 
-    new_actor(Tux, 160, 160, None, "actorlayer")
+    new_actor(Tux, *(p.spawn_point or (160, 160)), None, "actorlayer")
+
+    # what the level loaded stays for its whole run, so keep it out of the
+    # garbage collector's passes; spawns during play are recycled through
+    # the actor pools instead
+    gc.freeze()
 
-    game.cam_x = DISP_WID / 2 - 16
-    game.cam_y = DISP_HEI / 2 - 16
+    game.cam_x = game.prev_cam_x = DISP_WID / 2 - 16
+    game.cam_y = game.prev_cam_y = DISP_HEI / 2 - 16
 
     #new_actor(Slime, 300, 250, None, "actorlayer")
 
+    # DIM_TROUBLE_PROFILE=trace.csv (or .json) records the profiler's phase
+    # timings of every frame and writes them there on exit
+    trace_path = os.environ.get("DIM_TROUBLE_PROFILE")
+    if trace_path:
+        profiler.enabled = profiler.record = True
+
     running = True
+    tick_length = 1 / TICK_RATE
+    accumulator = 0.0
 
     while running:
-        clock.tick(FPS)
+        accumulator += clock.tick(FPS) / 1000
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-            if event.type == pygame.KEYDOWN:
+            if game.dialog is not None:
+                game.dialog.handle_event(event)
+            elif event.type == pygame.KEYDOWN:
                 if event.key == JUMP:
                     game.game_player.jump()
                     # print("event jump")
+                if event.key == DEBUG:
+                    game.debug_mode = not game.debug_mode
+                    profiler.enabled = game.debug_mode or bool(trace_path)
+
+        # Simulate in fixed ticks so the game speed doesn't depend on the
+        # frame rate; after MAX_FRAME_SKIP ticks the backlog is dropped and
+        # the game slows down rather than spiralling further behind.
+        ticks = 0
+        while accumulator >= tick_length and ticks < MAX_FRAME_SKIP:
+            game.game_mode()
+            accumulator -= tick_length
+            ticks += 1
+
+        if accumulator >= tick_length:
+            accumulator = 0.0
+
+        game.alpha = accumulator / tick_length
 
         display.fill(BLACK)
-        game.game_mode()
+        game.render_mode()
         game.run()
 
-        pygame.display.update()
+        with profiler.section("display"):
+            pygame.display.update()
+
+        profiler.end_frame()
+
+    if trace_path:
+        profiler.dump(trace_path)
 
 
 if __name__ == "__main__":
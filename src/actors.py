@@ -1,149 +1,233 @@
+import time
+
 import pygame
 
 from src.game import *
 from src.utils import *
 from src.sprites import *
+from src.profiler import profiler
+from src.spatial import ActorIndex, ActorList, ChunkedSolidGrid, SolidGrid, block_shape
+from src.tilemap import (
+    CHUNK_SIZE,
+    STREAM_CACHE,
+    STREAM_RADIUS,
+    ChunkedLayer,
+    LayerChunks,
+    TilesetRegistry,
+    chunk_range,
+    layer_chunks,
+    layer_grid,
+)
+from src.mapfile import load_map
+from src.systems import slime_system
+from src.collisions import ENEMY, PLAYER, PROJECTILE, SOLID, on_contact
+
+
+# Actor types that object layers can spawn, by the type (or "class", since
+# Tiled 1.9) given to the objects in Tiled
+ACTOR_TYPES = {}
+
 
+def register_actor(actor_type):
+    ACTOR_TYPES[actor_type.__name__] = actor_type
+    return actor_type
 
-def game_play():
-    if game:
-        # 1) UPDATE PHASE
-        #
-        # Create, update, and destroy actors
-        #   For instance, new actors may be created (maybe spawned by something else or some event)
-        #   Each actor must update its current state based on what's going on
-        #   Some actors might "die" (be killed or despawn) and be removed from the game
-
-        run_actors()
-
-        # 2) CAMERA PHASE
-        #
-        # Determine where the camera is. The camera phase occurs after the update phase, because
-        # we want all actors to have finished processing (and figured out their new x-, y- positions,
-        # and what they're doing) before we decide where to place the camera.
-        #
-        # Currently, the camera just follows Tux around, but we could imagine more
-        # complicated scenarios.
-        #
-        # For instance, if Tux is on the edge of the map, the camera may stop scrolling.
-        # Cut scenes, boss introductions, or special triggers may require customized control
-        # of the camera.
-        # Visual effects such as screen-shake may also cause the camera's position to change.
-
-        game.cam_x = game.game_player.shape.x - (DISP_WID / 2) + game.game_player.w / 2
-        game.cam_y = game.game_player.shape.y - (DISP_HEI / 2) + game.game_player.h / 2
-
-        # 3) RENDER PHASE
-        #
-        # Render each actor and whatever else (e.g. particle effects, etc) needs to be rendered.
-        # The render phase happens after both the update and camera phase. This ensures that literally
-        # nothing is drawn to the screen until after we've finalized the location of the camera.
-        # (This is in contrast to a mixed update-and-render approach. In such an approach, it would be
-        # difficult for any actor to change the location of the camera during their run() processing,
-        # since other actors may have already rendered themselves onto the screen, if such actors had
-        # their run() method processed first.)
-        #
-        # It may be necessary to order the actors by z-index during a render phase if actors
-        # can overlap each other.
-        # For instance, if a large sprite shoots small bullets, the bullets should probably be rendered
-        # on top of (rather than behind) the large sprite. This means that the bullets must be rendered
-        # after the large sprite.
-        # (Note that the order in which objects are rendered does not necessarily need to be the same order
-        # in which we invoke the run() method.)
-        # render_actors()
+
+def object_properties(obj):
+    return {i["name"]: i["value"] for i in obj.get("properties", ())}
 
 
 class GameMap:
-    def __init__(self, json_file):
-        self.mapdata = load_json(json_file)
+    def __init__(self, json_file, streaming=None):
+        # compiled to a binary copy on first load and mapped into memory, so
+        # the tiles of a streamed map are only read where it is visited; see
+        # src/mapfile.py
+        self.mapdata = load_map(json_file, memory_map=True)
+        self.tilesets = TilesetRegistry(self.mapdata["tilesets"])
+        # infinite maps load, spawn and bake their chunks around the camera
+        # as it moves instead of all at once
+        if streaming is None:
+            streaming = self.mapdata.get("infinite", False)
+        self.streaming = streaming
+        # where Tux starts, if the map has an object marking it
+        self.spawn_point = None
 
     def draw_tiles(self):
+        game.solid_grid = SolidGrid()
+
         for i in self.mapdata["layers"]:
-            game.actor[i["name"]] = []
-
-            if i["type"] == "tilelayer":
-                data_iterator = 0
-                for y in range(0, i["height"]):
-                    for x in range(0, i["width"]):
-                        tile_id = i["data"][data_iterator]
-
-                        if tile_id > 0:
-                            tileset = self.get_tileset(tile_id)
-
-                            if (
-                                    i["name"] == "BG"
-                                    or i["name"] == "FG"
-                                    or i["name"] == "MG"
-                            ):
-                                new_actor(
-                                    Sprite,
-                                    x * 16,
-                                    y * 16,
-                                    [tileset[0], tile_id - tileset[1]],
-                                    i["name"],
-                                )
-
-                            if i["name"] == "solid":
-                                new_actor(
-                                    Block,
-                                    x * 16,
-                                    y * 16,
-                                    [tile_id - tileset[1]],
-                                    i["name"],
-                                )
-                        data_iterator += 1
+            game.actor[i["name"]] = ActorList()
+            game.actor_index[i["name"]] = ActorIndex()
+
+            if i["type"] == "objectgroup":
+                self.spawn_objects(i)
+                continue
+
+            if i["type"] != "tilelayer":
+                continue
+
+            if i["name"] == "BG" or i["name"] == "FG" or i["name"] == "MG":
+                layer = ChunkedLayer(
+                    i["width"],
+                    i["height"],
+                    self.mapdata["tilewidth"],
+                    self.mapdata["tileheight"],
+                    max_chunks=STREAM_CACHE if self.streaming else None,
+                )
+                if self.streaming:
+                    layer.load(LayerChunks(i, layer.chunk_size), self.get_tile)
+                else:
+                    layer.load(layer_chunks(i, layer.chunk_size), self.get_tile)
+                    layer.bake()
+                new_actor(TileLayer, 0, 0, [layer], i["name"])
+
+            if i["name"] == "solid":
+                # static solids are resolved against a grid of block sorts
+                # instead of becoming one Block actor per tile
+                if self.streaming:
+                    solid_grid = ChunkedSolidGrid(
+                        LayerChunks(i),
+                        self.tilesets.firstgids,
+                        self.mapdata["tilewidth"],
+                        self.mapdata["tileheight"],
+                    )
+                else:
+                    grid, x, y = layer_grid(i)
+                    solid_grid = SolidGrid.from_layer(
+                        grid,
+                        grid.shape[1],
+                        grid.shape[0],
+                        self.tilesets.firstgids,
+                        self.mapdata["tilewidth"],
+                        self.mapdata["tileheight"],
+                        x,
+                        y,
+                    )
+                # keep the solid actors spawned by the layers before this one
+                solid_grid.dynamic = game.solid_grid.dynamic
+                game.solid_grid = solid_grid
+                new_actor(SolidLayer, 0, 0, None, i["name"])
+
+    def spawn_objects(self, layer):
+        """Spawn the actors of a Tiled object layer into the layer of the same
+        name; those of a streamed map are left to an `ObjectLayer` to spawn
+        as the camera comes near them."""
+        objects = self.layer_objects(layer)
+        if not self.streaming:
+            for actor_type, x, y, arr in objects:
+                new_actor(actor_type, x, y, arr, layer["name"])
+            return
 
-    def get_tileset(self, tile_gid):
-        for i in range(0, len(self.mapdata["tilesets"])):
-            tileset_gid = self.mapdata["tilesets"][i]["firstgid"]
-            tileset_tile_count = self.mapdata["tilesets"][i]["tilecount"]
+        chunk_w = self.mapdata["tilewidth"] * CHUNK_SIZE
+        chunk_h = self.mapdata["tileheight"] * CHUNK_SIZE
+        chunks = {}
+        for obj in objects:
+            key = (int(obj[1] // chunk_w), int(obj[2] // chunk_h))
+            chunks.setdefault(key, []).append(obj)
+        new_actor(ObjectLayer, 0, 0, [chunks, chunk_w, chunk_h], layer["name"])
+
+    def layer_objects(self, layer):
+        """The `(actor_type, x, y, arr)` of every actor of a Tiled object layer."""
+        objects = []
+        for obj in layer["objects"]:
+            kind = obj.get("type") or obj.get("class")
+            properties = object_properties(obj)
+
+            x = obj["x"]
+            # tile objects are positioned by their bottom left corner
+            y = obj["y"] - obj["height"] if "gid" in obj else obj["y"]
+
+            if kind == "Tux" or properties.get("spawnpoint"):
+                if self.spawn_point is None:
+                    self.spawn_point = (x, y)
+                continue
 
-            if tileset_gid <= tile_gid < tileset_tile_count + tileset_gid:
-                image = self.mapdata["tilesets"][i]["image"]
-                return [
-                    pygame.image.load(image.replace("..", "res")).convert_alpha(),
-                    tileset_gid,
-                ]
+            actor_type = ACTOR_TYPES.get(kind)
+            if actor_type is not None:
+                objects.append((actor_type, x, y, actor_type.object_args(properties)))
 
-        return [None, 0]
+        return objects
+
+    def get_tile(self, tile_gid):
+        return self.tilesets.get(tile_gid)
+
+    def get_tileset(self, tile_gid):
+        return self.tilesets.get_tileset(tile_gid)
 
 
 class Actor:
-    id = 0
+    # Actors use __slots__ and keep everything that is the same for a whole
+    # class (size, debug color, frame tables, animations) on the class, since
+    # a map can hold a great many of them.
+    __slots__ = (
+        "id",
+        "alive",
+        "active",
+        "x",
+        "y",
+        "prev_x",
+        "prev_y",
+        "xspeed",
+        "yspeed",
+        "offsx",
+        "offsy",
+        "anim",
+        "frame",
+        "frame_index",
+        "shape",
+        "sprite_sheet",
+    )
+
+    cullable = True
+    sleeps = False
+    # a system whose run(actors) runs all the awake actors of the class at
+    # once, in place of their own run()
+    batch = None
+    # what the actor is, for the contact handlers (see src/collisions.py)
+    tags = 0
+    z = 0
+    w = 16
+    h = 16
+    solid = False
+    color = (100, 149, 237)
 
     def __init__(self, x, y, arr=None):
+        # the rect is the one object an actor allocates; everything else is
+        # set by reset(), which spawn() also calls on actors taken back from
+        # a pool to reuse them in place
+        self.shape = pygame.Rect(0, 0, self.w, self.h)
+        self.reset(x, y, arr)
+
+    def reset(self, x, y, arr=None):
+        """(Re)initialize the actor's state for a spawn at `(x, y)`."""
+        self.id = 0
+        self.alive = False
+        self.active = False
         self.x = x
         self.y = y
-        self.h = 16
-        self.w = 16
+        self.prev_x = x
+        self.prev_y = y
         self.xspeed = 0
         self.yspeed = 0
         self.offsx = 0
         self.offsy = 0
-        self.arr = arr
         self.anim = None
-        self.frame = None
-        self.shape = None
-        self.color = (100, 149, 237)
+        self.frame = ()
         self.frame_index = 0
-        self.id = Actor.id
-        self.frame = []
+        self.sprite_sheet = None
 
-        # Are we sure pygame.Rect takes height as the 3rd parameter and width as the 4th parameter?
+        self.shape.update(self.x, self.y, self.w, self.h)
 
-        self.shape = pygame.Rect(self.x, self.y, self.w, self.h)
-        self.solid = False
+        if arr is not None:
+            if len(arr) == 1:
+                self.sprite_sheet = arr[0]
 
-        if self.arr is not None:
-            if len(self.arr) == 1:
-                self.sprite_sheet = self.arr[0]
+    @classmethod
+    def object_args(cls, properties):
+        """The `arr` to spawn the actor with from the properties of a map object."""
+        return None
 
     def load_sprite(self, _spr, _w=16, _h=16, _offs=(0, 0)):
-        self.frame = []
-        sprite_size = _spr.get_size()
-        sprite_w = int(sprite_size[0])
-        sprite_h = int(sprite_size[1])
-
         if _offs == "centered":
             self.offsx = (_w - self.w) / 2
             self.offsy = (_h - self.h) / 2
@@ -151,13 +235,19 @@ class Actor:
             self.offsx = _offs[0]
             self.offsy = _offs[1]
 
-        for i in range(0, int(sprite_h / _h)):
-            for j in range(0, int(sprite_w / _w)):
-                self.frame.append((j * _w, i * _h, _w, _h))
+        self.frame = frame_table(_spr, _w, _h).rects
+
+    def screen_pos(self):
+        """Where to draw the actor, interpolated between the last two ticks."""
+        cam_x, cam_y = game.camera()
+        return (
+            self.prev_x + (self.x - self.prev_x) * game.alpha - cam_x,
+            self.prev_y + (self.y - self.prev_y) * game.alpha - cam_y,
+        )
 
     def collision(self, direction):
-        for i in game_map.actor:
-            if i.typeof() == "Block":
+        for i in game.solid_grid.dynamic:
+            if i.tags & SOLID:
                 if i.shape.colliderect(self.shape):
                     if i.solid:
                         if direction == "horizontal":
@@ -200,57 +290,87 @@ class Actor:
 
 
 class Sprite(Actor):
-    def __init__(self, x, y, arr=None):
-        super().__init__(x, y, arr=arr)
-        self.x = x
-        self.y = y
-        self.w = 16
-        self.h = 16
-        self.arr = arr
-        self.frame = []
+    __slots__ = ("index",)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
         self.index = None
 
-        if self.arr is not None:
-            if len(self.arr) >= 1:
-                self.sprite_sheet = self.arr[0]
+        if arr is not None:
+            if len(arr) >= 1:
+                self.sprite_sheet = arr[0]
+
+            if len(arr) >= 2:
+                self.index = arr[1]
+
+            if len(arr) >= 3:
+                self.load_sprite(self.sprite_sheet, arr[2][0], arr[2][1])
+            elif len(arr) >= 1:
                 self.load_sprite(self.sprite_sheet)
 
-            if len(self.arr) >= 2:
-                self.index = self.arr[1]
+    def render(self):
+        x, y = self.screen_pos()
+        draw_sprite(self.sprite_sheet, self.frame[self.index], x, y)
+
+    def typeof(self):
+        return "Sprite"
+
+
+class TileLayer(Actor):
+    __slots__ = ("layer",)
 
-            if len(self.arr) >= 3:
-                self.size = self.arr[2]
-                self.load_sprite(self.sprite_sheet, self.size[0], self.size[1])
+    cullable = False
+    color = (255, 255, 0)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
+        self.layer = arr[0]
+
+    def run(self):
+        if self.layer.streaming:
+            self.layer.stream(
+                game.cam_x - self.x, game.cam_y - self.y, DISP_WID, DISP_HEI
+            )
 
     def render(self):
-        draw_sprite(
-            self.sprite_sheet,
-            self.frame[self.index],
-            self.x - game.cam_x,
-            self.y - game.cam_y,
+        cam_x, cam_y = game.camera()
+        sprite_batch.extend(
+            self.layer.blit_list(cam_x - self.x, cam_y - self.y, DISP_WID, DISP_HEI)
         )
 
+    def debug(self):
+        for (cx, cy), _ in self.layer.visible_chunks(
+                game.cam_x - self.x, game.cam_y - self.y, DISP_WID, DISP_HEI
+        ):
+            pygame.draw.rect(
+                display,
+                self.color,
+                (
+                    self.x + cx * self.layer.chunk_w - game.cam_x,
+                    self.y + cy * self.layer.chunk_h - game.cam_y,
+                    self.layer.chunk_w,
+                    self.layer.chunk_h,
+                ),
+                1,
+            )
+
     def typeof(self):
-        return "Sprite"
+        return "TileLayer"
 
 
+@register_actor
 class Slime(Actor):
-    def __init__(self, x, y, arr=None):
-        super().__init__(x, y, arr)
-        self.x = x
-        self.y = y
-        self.w = 16
-        self.h = 16
-        self.arr = arr
-        self.frame = []
-        self.anim = [0]
-        self.timer = 0
-        self.dist = 0
-        self.jiggleAnim = [0, 3]
-        self.direction = 0
+    __slots__ = ()
+
+    sleeps = True
+    batch = slime_system
+    tags = ENEMY
+    jiggleAnim = (0, 3)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
         self.anim = self.jiggleAnim
-        self.shape = pygame.Rect(self.x, self.y, self.h, self.w)
-        self.load_sprite(sprite_slime, 32, 32, "centered")
+        self.load_sprite(sprite("slime"), 32, 32, "centered")
 
     def debug(self):
         pygame.draw.rect(
@@ -265,16 +385,11 @@ class Slime(Actor):
         )
 
     def run(self):
-        if game.game_player.shape.colliderect(self.shape):
-            game.game_player.die()
-
-        self.xspeed, self.yspeed = (
-                (
-                        pygame.math.Vector2(game.game_player.shape.topleft)
-                        - pygame.math.Vector2(self.shape.topleft)
-                ).normalize()
-                * 0.5
-        ).xy
+        chase = pygame.math.Vector2(game.game_player.shape.topleft) - pygame.math.Vector2(
+            self.shape.topleft
+        )
+        # normalize() raises on a zero vector, i.e. when sitting right on Tux
+        self.xspeed, self.yspeed = (chase.normalize() * 0.5).xy if chase else (0, 0)
 
         # Attempt to move in the x-axis by xspeed
 
@@ -303,34 +418,40 @@ class Slime(Actor):
         self.frame_index += 0.1
 
     def render(self):
+        x, y = self.screen_pos()
         draw_sprite(
-            sprite_slime,
+            sprite("slime"),
             self.frame[
                 int(self.anim[0])
                 + math.floor(self.frame_index % (self.anim[-1] - self.anim[0] + 1))
                 ],
-            self.x - game.cam_x - self.offsx,
-            self.y - game.cam_y - self.offsy,
+            x - self.offsx,
+            y - self.offsy,
         )
 
     def typeof(self):
         return "Slime"
 
 
+@register_actor
 class VerticallyMovingBlock(Actor):
-    def __init__(self, x, y, arr=None):
-        super().__init__(x, y, arr)
+    __slots__ = ("originalY", "frame_count")
+
+    solid = True
+    tags = SOLID
+    color = (200, 200, 200)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
         self.originalY = y
-        self.load_sprite(sprite_block)
-        self.solid = True
-        self.color = (200, 200, 200)
+        self.load_sprite(sprite("block"))
         self.frame_count = 0
 
-        if not self.arr:
+        if not arr:
             return
 
-        if self.arr.len() == 1:
-            self.sprite_sheet = self.arr[0]
+        if len(arr) == 1:
+            self.sprite_sheet = arr[0]
             self.load_sprite(self.sprite_sheet)
 
     def run(self):
@@ -342,9 +463,8 @@ class VerticallyMovingBlock(Actor):
         self.shape.y = self.y
 
     def render(self):
-        draw_sprite(
-            sprite_block, self.frame[0], self.x - game.cam_x, self.y - game.cam_y
-        )
+        x, y = self.screen_pos()
+        draw_sprite(sprite("block"), self.frame[0], x, y)
 
     def typeof(self):
         return "Block"
@@ -363,26 +483,25 @@ class VerticallyMovingBlock(Actor):
         )
 
 
+@register_actor
 class HorizontallyMovingBlock(Actor):
-    def __init__(self, x, y, arr=None):
-        super().__init__(x, y, arr)
+    __slots__ = ("originalX", "frame_count")
+
+    solid = True
+    tags = SOLID
+    color = (200, 200, 200)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
         self.originalX = x
-        self.x = x
-        self.y = y
-        self.w = 16
-        self.h = 16
-        self.arr = arr
-        self.shape = pygame.Rect(self.x, self.y, self.h, self.w)
-        self.load_sprite(sprite_block)
-        self.solid = True
-        self.color = (200, 200, 200)
+        self.load_sprite(sprite("block"))
         self.frame_count = 0
 
-        if not self.arr:
+        if not arr:
             return
 
-        if self.arr.len() == 1:
-            self.sprite_sheet = self.arr[0]
+        if len(arr) == 1:
+            self.sprite_sheet = arr[0]
             self.load_sprite(self.sprite_sheet)
 
     def run(self):
@@ -394,9 +513,8 @@ class HorizontallyMovingBlock(Actor):
         self.shape.y = self.y
 
     def render(self):
-        draw_sprite(
-            sprite_block, self.frame[0], self.x - game.cam_x, self.y - game.cam_y
-        )
+        x, y = self.screen_pos()
+        draw_sprite(sprite("block"), self.frame[0], x, y)
 
     def typeof(self):
         return "Block"
@@ -415,57 +533,45 @@ class HorizontallyMovingBlock(Actor):
         )
 
 
+@register_actor
 class Block(Actor):
-    def __init__(self, x, y, arr=None):
-        super().__init__(x, y, arr)
+    __slots__ = ("solid_offs_x", "solid_offs_y", "sort", "solid")
+
+    sleeps = True
+    tags = SOLID
+    color = (100, 100, 100)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
         self.solid_offs_x = 0
         self.solid_offs_y = 0
-        self.shape = pygame.Rect(self.x, self.y, self.w, self.h)
-        self.solid = True
-        self.color = (100, 100, 100)
-        self.anim = [0.0, 0.0]
         self.solid = True
         self.sort = 0
-        self.sprite_sheet = sprite_block
-
-        if self.arr is not None:
-            if len(self.arr) >= 1:
-                self.sort = self.arr[0]
-
-                if self.sort == 0:
-                    self.shape.w = 16
-                    self.shape.h = 16
-
-                if self.sort == 1:
-                    self.shape.w = 16
-                    self.shape.h = 8
+        self.sprite_sheet = sprite("block")
 
-                if self.sort == 2:
-                    self.solid_offs_x = 0
-                    self.solid_offs_y = 8
-                    self.shape.w = 16
-                    self.shape.h = 8
-
-                if self.sort == 3:
-                    self.solid_offs_x = 0
-                    self.solid_offs_y = 0
-                    self.shape.w = 8
-                    self.shape.h = 16
+        if arr is not None:
+            if len(arr) >= 1:
+                self.sort = arr[0]
+                (
+                    self.solid_offs_x,
+                    self.solid_offs_y,
+                    self.shape.w,
+                    self.shape.h,
+                ) = block_shape(self.sort)
 
-                if self.sort == 4:
-                    self.solid_offs_x = 8
-                    self.solid_offs_y = 0
-                    self.shape.w = 8
-                    self.shape.h = 16
+            if len(arr) >= 2:
+                self.sort = arr[1]
 
-            if len(self.arr) >= 2:
-                self.sort = self.arr[1]
+            if len(arr) >= 3:
+                self.solid = arr[2]
 
-            if len(self.arr) >= 3:
-                self.solid = self.arr[2]
+        self.shape.x = self.x + self.solid_offs_x
+        self.shape.y = self.y + self.solid_offs_y
 
-                if not self.solid:
-                    self.color = (200, 200, 200, 90)
+    @classmethod
+    def object_args(cls, properties):
+        sort = properties.get("sort", 0)
+        return [sort, sort, properties.get("solid", True)]
 
     def run(self):
         self.shape.x = self.x + self.solid_offs_x
@@ -478,7 +584,7 @@ class Block(Actor):
     def debug(self):
         pygame.draw.rect(
             display,
-            self.color,
+            self.color if self.solid else (200, 200, 200, 90),
             (
                 self.shape.x - game.cam_x,
                 self.shape.y - game.cam_y,
@@ -489,42 +595,153 @@ class Block(Actor):
         )
 
 
+class ObjectLayer(Actor):
+    """Spawns the objects of a streamed map's object layer a chunk at a time,
+    as the camera comes within `STREAM_RADIUS` chunks of them.
+
+    `arr` is `[chunks, chunk_w, chunk_h]`, where `chunks` maps chunk keys to
+    the `(actor_type, x, y, arr)` of the objects in them (see
+    `GameMap.layer_objects`). Each object is spawned once; after that it is
+    up to the actor (sleeping actors stop running away from the camera).
+    """
+
+    __slots__ = ("chunks", "chunk_w", "chunk_h")
+
+    cullable = False
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
+        self.chunks, self.chunk_w, self.chunk_h = arr
+
+    def run(self):
+        if not self.chunks:
+            return
+
+        layer = game.actor_layer[self.id]
+        for key in chunk_range(
+            game.cam_x - self.x,
+            game.cam_y - self.y,
+            DISP_WID,
+            DISP_HEI,
+            self.chunk_w,
+            self.chunk_h,
+            STREAM_RADIUS,
+        ):
+            for actor_type, x, y, arr in self.chunks.pop(key, ()):
+                new_actor(actor_type, self.x + x, self.y + y, arr, layer)
+
+    def debug(self):
+        pass
+
+    def typeof(self):
+        return "ObjectLayer"
+
+
+class SolidLayer(Actor):
+    """Debug view of the static solid tiles in `game.solid_grid`."""
+
+    __slots__ = ()
+
+    cullable = False
+    sleeps = True
+    color = (100, 100, 100)
+
+    def debug(self):
+        for x, y, w, h in game.solid_grid.solid_rects(game.view_rect()):
+            pygame.draw.rect(
+                display,
+                self.color,
+                (x - game.cam_x, y - game.cam_y, w, h),
+                0,
+            )
+
+    def typeof(self):
+        return "SolidLayer"
+
+
+@register_actor
+class Bullet(Actor):
+    """A projectile flying in a straight line until it hits a solid or its
+    `lifetime` (in ticks) runs out. `arr` is `[xspeed, yspeed, lifetime]`."""
+
+    __slots__ = ("lifetime",)
+
+    tags = PROJECTILE
+
+    w = 4
+    h = 4
+    z = 1
+    color = (255, 255, 255)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
+        self.sprite_sheet = sprite("bullet")
+        self.lifetime = 120
+
+        if arr is not None:
+            self.xspeed, self.yspeed = arr[0], arr[1]
+            if len(arr) >= 3:
+                self.lifetime = arr[2]
+
+    @classmethod
+    def object_args(cls, properties):
+        return [
+            properties.get("xspeed", 0),
+            properties.get("yspeed", 0),
+            properties.get("lifetime", 120),
+        ]
+
+    def run(self):
+        self.lifetime -= 1
+        self.x += self.xspeed
+        self.y += self.yspeed
+        self.shape.topleft = self.x, self.y
+
+        if self.lifetime <= 0 or collision_check(self.shape):
+            destroy(self)
+
+    def render(self):
+        x, y = self.screen_pos()
+        draw_sprite(self.sprite_sheet, None, x, y)
+
+    def typeof(self):
+        return "Bullet"
+
+
 class Tux(Actor):
+    __slots__ = ("stand_still", "autocon", "has_jumped", "program_jump")
+
+    tags = PLAYER
 
     GRAVITY = 0.2
     JUMP_VEL = -3
     MAX_VEL = 3
 
-    def __init__(self, x, y, arr=None):
-        super().__init__(x, y, arr)
-        self.frame = []
-        self.walk_right = [0.0, 3.0]
-        self.walk_up = [4.0, 7.0]
-        self.walk_down = [8.0, 11.0]
-        self.walk_left = [12.0, 15.0]
-        self.stand_right = [0]
-        self.stand_left = [12]
-        self.stand_up = [4]
-        self.stand_down = [8]
+    color = (0, 255, 0)
+    walk_right = (0.0, 3.0)
+    walk_up = (4.0, 7.0)
+    walk_down = (8.0, 11.0)
+    walk_left = (12.0, 15.0)
+    stand_right = (0,)
+    stand_left = (12,)
+    stand_up = (4,)
+    stand_down = (8,)
+
+    def reset(self, x, y, arr=None):
+        super().reset(x, y, arr)
         self.anim = self.walk_right
         self.stand_still = self.stand_right
-        self.xspeed = 0
-        self.yspeed = 0
         self.autocon = False
-        self.idle = False
-        self.step_count = 0
-        self.shape = pygame.Rect(self.x, self.y, self.h, self.w)
-        self.load_sprite(sprite_tux)
-        self.solid = False
-        self.color = (0, 255, 0)
-        game.game_player = self
+        self.load_sprite(sprite("tux"))
 
         self.has_jumped = False
         self.program_jump = False
 
     def run(self):
 
-        keys = pygame.key.get_pressed()
+        # autocon lets a script (cutscenes, the benchmark) drive Tux: it is
+        # called with Tux and returns the pressed keys in place of the keyboard
+        keys = self.autocon(self) if self.autocon else pygame.key.get_pressed()
 
         if keys[RIGHT]:
             # print("right")  # * It works, so the issue isn't input handling
@@ -592,14 +809,15 @@ class Tux(Actor):
         self.frame_index += 0.14
 
     def render(self):
+        x, y = self.screen_pos()
         draw_sprite(
-            sprite_tux,
+            sprite("tux"),
             self.frame[
                 int(self.anim[0])
                 + math.floor(self.frame_index % (self.anim[-1] - self.anim[0] + 1))
                 ],
-            self.shape.x - game.cam_x,
-            self.shape.y - game.cam_y,
+            x,
+            y,
         )
 
     def debug(self):
@@ -616,10 +834,8 @@ class Tux(Actor):
         )
 
     def jump(self):
-        print("jump 1")
         if not self.has_jumped:
             self.program_jump = True
-            print("jump 2")
 
     def die(self):
         pass
@@ -630,11 +846,16 @@ class Tux(Actor):
         return "Tux"
 
 
-def collision_check(rectangle):
-    return any(i.shape.colliderect(rectangle) and i.solid for i in game.actor["solid"])
+@on_contact(PLAYER, ENEMY)
+def enemy_touches_player(player, enemy):
+    player.die()
+
 
+def collision_check(rectangle):
+    if profiler.enabled:
+        start = time.perf_counter()
+        hit = game.solid_grid.collide(rectangle)
+        profiler.add("collision", time.perf_counter() - start)
+        return hit
 
-def render_actors():
-    for i in game.actor.values():
-        for j in i:
-            j.render()
+    return game.solid_grid.collide(rectangle)
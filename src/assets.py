@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from src.atlas import ATLAS_INDEX, Atlas
+
+
+class AssetManager:
+    """Images registered by key and loaded on demand.
+
+    `get` loads an image the first time it is asked for. `preload` decodes
+    images ahead of time on a thread pool; the decoded surfaces are only
+    converted to the display format (which must happen on the main thread)
+    by `poll` or `get`, so a loading screen can keep drawing meanwhile and
+    show `progress`.
+
+    Keys that were never registered are taken to be paths. When an atlas is
+    in use, images packed in it are served as areas of its pages, so each
+    page is opened once instead of every image file.
+    """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.paths = {}
+        self.loaded = {}
+        self.pending = {}
+        self.requested = set()
+        self.executor = None
+        self.atlas = None
+
+    def use_atlas(self, index_path=ATLAS_INDEX):
+        self.atlas = Atlas(index_path)
+
+    def register(self, key, path, alpha=True):
+        self.paths[key] = (path, alpha)
+
+    def get(self, key) -> pygame.Surface:
+        asset = self.loaded.get(key)
+        if asset is not None:
+            return asset
+
+        if key not in self.paths:
+            self.register(key, key)
+
+        path = self.paths[key][0]
+        if self.atlas is not None and path in self.atlas:
+            page, rect = self.atlas.region(path)
+            self.loaded[key] = self.get(page).subsurface(rect)
+            return self.loaded[key]
+
+        future = self.pending.pop(key, None)
+        if future is not None:
+            return self._finish(key, future.result())
+
+        return self._finish(key, pygame.image.load(self.paths[key][0]))
+
+    def _finish(self, key, image):
+        image = image.convert_alpha() if self.paths[key][1] else image.convert()
+        self.loaded[key] = image
+        return image
+
+    def preload(self, keys=None):
+        """Start decoding `keys` (every registered asset by default) in the background."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="assets"
+            )
+
+        for key in list(self.paths) if keys is None else keys:
+            if key not in self.paths:
+                self.register(key, key)
+
+            self.requested.add(key)
+
+            path = self.paths[key][0]
+            if self.atlas is not None and path in self.atlas:
+                # decode the page instead; the image is cut out of it in poll()
+                key, _ = self.atlas.region(path)
+                if key not in self.paths:
+                    self.register(key, key)
+
+            if key not in self.loaded and key not in self.pending:
+                self.pending[key] = self.executor.submit(
+                    pygame.image.load, self.paths[key][0]
+                )
+
+    def poll(self):
+        """Finish the assets decoded so far and return the loading progress."""
+        for key, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[key]
+                self._finish(key, future.result())
+
+        if self.atlas is not None:
+            for key in self.requested:
+                if key not in self.loaded:
+                    path = self.paths[key][0]
+                    if path in self.atlas and self.atlas.region(path)[0] in self.loaded:
+                        self.get(key)
+
+        return self.progress
+
+    @property
+    def progress(self):
+        """Fraction (0-1) of the preloaded assets that are ready to use."""
+        if not self.requested:
+            return 1.0
+        return sum(key in self.loaded for key in self.requested) / len(self.requested)
+
+    @property
+    def done(self):
+        return not self.pending
+
+
+assets = AssetManager()
+
+if os.path.exists(ATLAS_INDEX):
+    assets.use_atlas(ATLAS_INDEX)
@@ -0,0 +1,147 @@
+"""Texture atlases for the small images under res/gfx.
+
+The packer bins the images into a few large pages and writes them with a
+JSON index mapping each source path to its page and area. Rerun it after
+adding or changing images:
+
+    python -m src.atlas
+
+At runtime `Atlas` reads the index, and the asset manager serves the
+indexed paths as areas of the pages instead of opening each file.
+"""
+import argparse
+import glob
+import json
+import os
+
+import pygame
+
+
+ATLAS_DIR = "res/gfx/atlas"
+ATLAS_INDEX = os.path.join(ATLAS_DIR, "atlas.json")
+
+
+def normalize(path):
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+class Atlas:
+    """The index of a packed atlas: source path -> (page path, area)."""
+
+    def __init__(self, index_path=ATLAS_INDEX):
+        with open(index_path) as file:
+            index = json.load(file)
+
+        directory = os.path.dirname(index_path)
+        self.pages = [normalize(os.path.join(directory, i)) for i in index["pages"]]
+        self.regions = {
+            normalize(path): (self.pages[region["page"]], tuple(region["rect"]))
+            for path, region in index["regions"].items()
+        }
+
+    def __contains__(self, path):
+        return normalize(path) in self.regions
+
+    def region(self, path):
+        """Return the `(page path, area)` a source image was packed at."""
+        return self.regions[normalize(path)]
+
+
+def pack(sizes, page_size=1024, padding=1):
+    """Shelf-pack `(w, h)` sizes into pages.
+
+    Returns one `(page, x, y)` per size, in the order given. Taller images
+    are placed first so the shelves waste little height.
+    """
+    placements = [None] * len(sizes)
+    pages = []  # per page: [shelf_y, shelf_height, cursor_x]
+
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        w, h = sizes[i][0] + padding, sizes[i][1] + padding
+        if w > page_size or h > page_size:
+            raise ValueError(f"image of size {sizes[i]} can't fit a {page_size}px page")
+
+        for page, shelf in enumerate(pages):
+            if shelf[2] + w > page_size:
+                # open a new shelf under the current one
+                shelf[0] += shelf[1]
+                shelf[1] = 0
+                shelf[2] = 0
+            if shelf[0] + h <= page_size:
+                break
+        else:
+            pages.append([0, 0, 0])
+            page, shelf = len(pages) - 1, pages[-1]
+
+        placements[i] = (page, shelf[2], shelf[0])
+        shelf[1] = max(shelf[1], h)
+        shelf[2] += w
+
+    return placements
+
+
+def build_atlas(sources, out_dir=ATLAS_DIR, page_size=1024, padding=1):
+    """Pack the images at `sources` into pages in `out_dir` and write the index."""
+    images = [pygame.image.load(path) for path in sources]
+    placements = pack([i.get_size() for i in images], page_size, padding)
+
+    page_count = max((i[0] for i in placements), default=-1) + 1
+    # trim every page to the area actually used
+    extents = [[0, 0] for _ in range(page_count)]
+    for image, (page, x, y) in zip(images, placements):
+        extents[page][0] = max(extents[page][0], x + image.get_width())
+        extents[page][1] = max(extents[page][1], y + image.get_height())
+
+    pages = [pygame.Surface(extent, pygame.SRCALPHA) for extent in extents]
+    regions = {}
+    for path, image, (page, x, y) in zip(sources, images, placements):
+        pages[page].blit(image, (x, y))
+        regions[normalize(path)] = {
+            "page": page,
+            "rect": [x, y, image.get_width(), image.get_height()],
+        }
+
+    os.makedirs(out_dir, exist_ok=True)
+    page_names = []
+    for i, page in enumerate(pages):
+        page_names.append(f"atlas-{i}.png")
+        pygame.image.save(page, os.path.join(out_dir, page_names[-1]))
+
+    with open(os.path.join(out_dir, "atlas.json"), "w") as file:
+        json.dump({"pages": page_names, "regions": regions}, file, indent=1)
+
+    return page_names, regions
+
+
+def find_sources(root="res/gfx", max_side=256):
+    """The images under `root` small enough to be worth packing."""
+    sources = []
+    for path in sorted(glob.glob(os.path.join(root, "**", "*.png"), recursive=True)):
+        if normalize(path).startswith(normalize(ATLAS_DIR) + "/"):
+            continue
+        w, h = pygame.image.load(path).get_size()
+        if max(w, h) <= max_side:
+            sources.append(normalize(path))
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack res/gfx images into atlases.")
+    parser.add_argument("--root", default="res/gfx")
+    parser.add_argument("--out", default=ATLAS_DIR)
+    parser.add_argument("--page-size", type=int, default=1024)
+    parser.add_argument(
+        "--max-side",
+        type=int,
+        default=256,
+        help="leave out images wider or taller than this (backgrounds, big sheets)",
+    )
+    args = parser.parse_args()
+
+    sources = find_sources(args.root, args.max_side)
+    pages, regions = build_atlas(sources, args.out, args.page_size)
+    print(f"packed {len(regions)} images into {len(pages)} page(s) in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,14 @@ import time
 
 import pygame
 
+from src.lang import tr
 from src.utils import blit_centered, ninepatch, text
 
 
 class Button:
+    """A clickable area. `label` is drawn translated when it is a string key
+    of the current language, see `src.lang`."""
+
     MULTIPLE_CLICK_INTERVAL = 0.3
     BACKGROUND = pygame.Color(20, 20, 200)
 
@@ -40,8 +44,13 @@ class Button:
 
         self.last_clicked = 0
         self.click_count = 0
+        # what `appearance` was and the area covered when the button was
+        # last drawn
+        self.drawn = None
+        self.drawn_area = None
 
-    def handle_event(self, event: pygame.event.Event):
+    def handle_event(self, event: pygame.event.Event) -> bool:
+        """Handle `event`; returns whether it clicked the button."""
         if self.mouseover and event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == pygame.BUTTON_LEFT:
                 if time.time() - self.last_clicked < self.MULTIPLE_CLICK_INTERVAL:
@@ -52,8 +61,61 @@ class Button:
                 if self.on_click:
                     for i, function in enumerate(self.on_click):
                         function(self, *self.arguments[i] if len(self.arguments) > i else ())
+                return True
+        return False
+
+    def appearance(self):
+        """Everything the look of the button depends on."""
+        return (
+            self.mouseover,
+            self.mouseclicking,
+            self.label,
+            self.icon,
+            self.color,
+            self.outcolor,
+            self.images,
+        )
+
+    @property
+    def dirty(self):
+        """Whether the button looks different from when it was last drawn."""
+        return self.appearance() != self.drawn
+
+    def surfaces(self):
+        """The surfaces drawn centered on the button, in order."""
+        surfaces = []
+        if self.images:
+            surfaces.append(
+                self.images[1] if self.mouseclicking and len(self.images) > 1 else self.images[0]
+            )
+        if (self.icon and not self.label) or (self.icon and self.label and not self.mouseover):
+            surfaces.append(self.icon)
+        if (self.label and not self.icon) or (self.icon and self.label and self.mouseover):
+            surfaces.append(
+                text(
+                    tr(self.label),
+                    tuple(pygame.Color(255, 255, 255) - self.color)
+                    if self.color
+                    else tuple(pygame.Color(255, 255, 255) - pygame.Color(self.BACKGROUND)),
+                )
+            )
+        return surfaces
+
+    def area(self):
+        """The area the button draws over; images and labels can overflow `rect`."""
+        return self.rect.unionall(
+            [i.get_rect(center=self.rect.center) for i in self.surfaces()]
+        )
+
+    def dirty_area(self):
+        """The area to redraw when the button changed: where it was drawn and
+        where it will be."""
+        area = self.area()
+        return area if self.drawn_area is None else area.union(self.drawn_area)
 
     def draw(self, screen: pygame.Surface):
+        self.drawn = self.appearance()
+        self.drawn_area = self.area()
         if self.color:
             pygame.draw.rect(
                 screen,
@@ -65,25 +127,8 @@ class Button:
                 if self.round_rect
                 else 0,
             )
-        if self.images:
-            blit_centered(
-                screen,
-                self.images[1] if self.mouseclicking and len(self.images) > 1 else self.images[0],
-                self.rect,
-            )
-        if (self.icon and not self.label) or (self.icon and self.label and not self.mouseover):
-            blit_centered(screen, self.icon, self.rect)
-        if (self.label and not self.icon) or (self.icon and self.label and self.mouseover):
-            blit_centered(
-                screen,
-                text(
-                    self.label,
-                    tuple(pygame.Color(255, 255, 255) - self.color)
-                    if self.color
-                    else tuple(pygame.Color(255, 255, 255) - pygame.Color(self.BACKGROUND)),
-                ),
-                self.rect,
-            )
+        for surface in self.surfaces():
+            blit_centered(screen, surface, self.rect)
 
     @property
     def mouseover(self):
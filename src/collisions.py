@@ -0,0 +1,133 @@
+"""Actor vs actor contacts.
+
+Every actor class has `tags`, a bitmask of what it is. Handlers registered
+with `on_contact` for a pair of tags are called with each pair of touching
+actors carrying them. `find_contacts` finds the touching pairs of a tick
+by sorting the actors with those tags along x and sweeping over them,
+instead of every actor testing every other one.
+"""
+
+# actor tags
+PLAYER = 1 << 0
+ENEMY = 1 << 1
+SOLID = 1 << 2
+PROJECTILE = 1 << 3
+
+# (tags of a, tags of b, handler(a, b))
+contact_handlers = []
+# tags -> tags of everything an actor with them has a handler with
+interests = {}
+
+
+def on_contact(tags_a, tags_b):
+    """Register the decorated function to be called as `handler(a, b)` for
+    every touching pair where `a` has one of `tags_a` and `b` one of
+    `tags_b`."""
+
+    def register(handler):
+        contact_handlers.append((tags_a, tags_b, handler))
+        interests.clear()
+        return handler
+
+    return register
+
+
+def interest(tags):
+    """The tags of everything an actor with `tags` has a handler with."""
+    mask = interests.get(tags)
+    if mask is None:
+        mask = 0
+        for tags_a, tags_b, _ in contact_handlers:
+            if tags & tags_a:
+                mask |= tags_b
+            if tags & tags_b:
+                mask |= tags_a
+        interests[tags] = mask
+    return mask
+
+
+def sweep(group_a, group_b):
+    """Yield the overlapping `(a, b)` pairs between two groups of actors.
+
+    Both groups are swept together along x; an actor is only tested against
+    the actors of the other group whose x extent reaches its left edge.
+    """
+    events = sorted(
+        [(i.shape.left, 0, i) for i in group_a] + [(i.shape.left, 1, i) for i in group_b],
+        key=lambda event: event[0],
+    )
+    open_actors = ([], [])
+
+    for left, side, actor in events:
+        shape = actor.shape
+        others = [i for i in open_actors[1 - side] if i.shape.right > left]
+        open_actors[1 - side][:] = others
+
+        for other in others:
+            if other.shape.colliderect(shape):
+                yield (actor, other) if side == 0 else (other, actor)
+
+        open_actors[side].append(actor)
+
+
+def sweep_within(group):
+    """Yield the overlapping pairs within one group of actors."""
+    open_actors = []
+    for actor in sorted(group, key=lambda i: i.shape.left):
+        shape = actor.shape
+        open_actors = [i for i in open_actors if i.shape.right > shape.left]
+
+        for other in open_actors:
+            if other.shape.colliderect(shape):
+                yield other, actor
+
+        open_actors.append(actor)
+
+
+def find_contacts(actors):
+    """Yield `(handler, a, b)` for every touching pair some handler is for.
+
+    Each handler only sweeps the actors carrying its tags, so e.g. many
+    enemies are never tested against each other just to find the player.
+    """
+    actors = [i for i in actors if interest(i.tags)]
+
+    for tags_a, tags_b, handler in contact_handlers:
+        if tags_a & tags_b:
+            # a handler within a kind of actor, e.g. enemies pushing each other
+            pairs = sweep_within([i for i in actors if i.tags & (tags_a | tags_b)])
+        else:
+            pairs = sweep(
+                [i for i in actors if i.tags & tags_a],
+                [i for i in actors if i.tags & tags_b],
+            )
+
+        # an actor carrying both tags is in both groups: it meets itself, and
+        # a pair of such actors comes up once from each side
+        seen = set()
+        for a, b in pairs:
+            if a is b:
+                continue
+            if not (a.tags & tags_a and b.tags & tags_b):
+                if not (b.tags & tags_a and a.tags & tags_b):
+                    continue
+                a, b = b, a
+
+            if a.tags & tags_b and b.tags & tags_a:
+                key = (id(a), id(b)) if id(a) < id(b) else (id(b), id(a))
+                if key in seen:
+                    continue
+                seen.add(key)
+
+            yield handler, a, b
+
+
+def resolve_contacts(actors):
+    """Call the handlers of every touching pair among `actors`; returns the
+    actors handled, which the handlers may have moved."""
+    handled = []
+    for handler, a, b in list(find_contacts(actors)):
+        if a.alive and b.alive:
+            handler(a, b)
+            handled += (a, b)
+    return handled
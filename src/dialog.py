@@ -0,0 +1,354 @@
+"""Dialogs from res/text/dialogs.json.
+
+The file is a graph of nodes by id, each with a `text`, an optional
+`moretext`, and either `responses` (each with a `text` and an optional
+`next` id) or `back`/`next` ids to page through. `compile_dialogs` checks
+the graph once and links the ids to the nodes themselves.
+
+`PageRenderer` wraps and renders the page of a node on a background thread,
+ahead of the player: opening a node queues the nodes it leads to, so by the
+time one is shown its page is usually waiting in the cache. The main loop
+never waits for a page; until it arrives the dialog shows the one before
+(or an empty box). `Dialog` runs one conversation and records the
+responses chosen in `game_data["dialogResponses"]`.
+
+The texts are looked up in the current language as `dialog.<id>.text`,
+`dialog.<id>.moretext` and `dialog.<id>.response.<index>`, falling back to
+the file's own.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+import pygame
+
+from src.globals import *
+from src.globals import game_data
+from src.lang import lang, tr
+from src.text import layout_text
+from src.utils import GOLD, WHITE, load_json
+
+
+DIALOGS_PATH = "res/text/dialogs.json"
+
+
+class DialogError(ValueError):
+    """A dialog file that doesn't describe a valid graph."""
+
+
+class Response:
+    def __init__(self, text, next=None):
+        self.text = text
+        self.next = next
+
+
+class DialogNode:
+    """One page of a dialog. `next`, `back` and the responses' `next` are
+    the nodes they lead to, or None."""
+
+    def __init__(self, id, text, moretext=None):
+        self.id = id
+        self.text = text
+        self.moretext = moretext
+        self.responses = []
+        self.back = None
+        self.next = None
+
+    def __repr__(self):
+        return f"DialogNode({self.id!r})"
+
+    def neighbours(self):
+        """The nodes this one leads to."""
+        nodes = [self.next, self.back, *(i.next for i in self.responses)]
+        return [i for i in nodes if i is not None]
+
+
+def compile_dialogs(data):
+    """Check the dialogs of a parsed dialog file and link them into nodes.
+
+    Returns a dict of id -> `DialogNode`; raises `DialogError` on the first
+    problem found.
+    """
+    if not isinstance(data, dict):
+        raise DialogError("the dialogs must be an object of nodes by id")
+
+    def string(value, where):
+        if not isinstance(value, str):
+            raise DialogError(f"{where} must be a string, not {value!r}")
+        return value
+
+    nodes = {}
+    for node_id, node in data.items():
+        if not isinstance(node, dict):
+            raise DialogError(f"dialog {node_id!r} must be an object")
+        moretext = node.get("moretext")
+        nodes[node_id] = DialogNode(
+            node_id,
+            string(node.get("text"), f"dialog {node_id!r}: text"),
+            None if moretext is None else string(moretext, f"dialog {node_id!r}: moretext"),
+        )
+
+    def link(node_id, where):
+        if node_id is None:
+            return None
+        node = nodes.get(node_id)
+        if node is None:
+            raise DialogError(f"{where} leads to unknown dialog {node_id!r}")
+        return node
+
+    for node_id, node in data.items():
+        compiled = nodes[node_id]
+        compiled.back = link(node.get("back"), f"dialog {node_id!r}: back")
+        compiled.next = link(node.get("next"), f"dialog {node_id!r}: next")
+
+        responses = node.get("responses", [])
+        if not isinstance(responses, list):
+            raise DialogError(f"dialog {node_id!r}: responses must be a list")
+        for i, response in enumerate(responses):
+            where = f"dialog {node_id!r}: response {i}"
+            if not isinstance(response, dict):
+                raise DialogError(f"{where} must be an object")
+            compiled.responses.append(
+                Response(
+                    string(response.get("text"), f"{where}: text"),
+                    link(response.get("next"), where),
+                )
+            )
+
+        if compiled.responses and (compiled.back or compiled.next):
+            raise DialogError(
+                f"dialog {node_id!r} has both responses and back/next pages"
+            )
+
+    return nodes
+
+
+@functools.lru_cache
+def load_dialogs(path=DIALOGS_PATH):
+    return compile_dialogs(load_json(path))
+
+
+class Page:
+    """The rendered page of a node: the text, and every response in its
+    normal and its selected color."""
+
+    def __init__(self, body, responses):
+        self.body = body
+        self.responses = responses
+
+    def convert(self):
+        self.body = self.body.convert_alpha()
+        self.responses = [
+            (normal.convert_alpha(), selected.convert_alpha())
+            for normal, selected in self.responses
+        ]
+        return self
+
+    @property
+    def height(self):
+        return self.body.get_height() + sum(i[0].get_height() for i in self.responses)
+
+
+class PageRenderer:
+    """Pages of dialog nodes, rendered on a background thread and kept in a
+    cache of the `max_pages` most recently used ones.
+
+    Like the asset manager, the thread only makes plain surfaces; `poll`
+    converts the finished ones to the display format on the main thread.
+    Every page is rendered on the worker, so a `font` passed in must not be
+    used anywhere else.
+    """
+
+    def __init__(
+        self,
+        font=None,
+        width=DISP_WID - 32,
+        color=WHITE,
+        selected_color=GOLD,
+        antialias=False,
+        line_spacing=2,
+        max_pages=16,
+    ):
+        # a font of its own, not shared with the main thread; only the
+        # worker ever renders or measures with it
+        self.font = pygame.font.Font(DEFAULT_FONT, 8) if font is None else font
+        self.width = width
+        self.color = color
+        self.selected_color = selected_color
+        self.antialias = antialias
+        self.line_spacing = line_spacing
+        # some fonts (dogica among them) render taller than their metrics
+        # say; measured here, before the worker starts using the font
+        self.line_height = self.font.size(" ")[1] + line_spacing
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.pending = {}
+        # a single worker, so the font is only ever used by one thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dialogs")
+        lang.register_cache(self)
+
+    def render_lines(self, text, color, prefix=""):
+        font = self.font
+        lines = layout_text(
+            text, font, self.width - font.size(prefix)[0]
+        ).lines
+        lines = [prefix + lines[0], *(" " * len(prefix) + i for i in lines[1:])]
+
+        height = self.line_height
+        surface = pygame.Surface((self.width, len(lines) * height), pygame.SRCALPHA)
+        for i, line in enumerate(lines):
+            surface.blit(font.render(line, self.antialias, color), (0, i * height))
+        return surface
+
+    def render(self, node):
+        """Wrap and render the page of `node` (safe to call off the main thread)."""
+        text = tr(f"dialog.{node.id}.text", node.text)
+        if node.moretext is not None:
+            text += "\n" + tr(f"dialog.{node.id}.moretext", node.moretext)
+        if node.responses:
+            text += "\n"
+
+        responses = []
+        for i, response in enumerate(node.responses):
+            response_text = tr(f"dialog.{node.id}.response.{i}", response.text)
+            responses.append(
+                (
+                    self.render_lines(response_text, self.color, "  "),
+                    self.render_lines(response_text, self.selected_color, "> "),
+                )
+            )
+
+        return Page(self.render_lines(text, self.color), responses)
+
+    def prefetch(self, nodes):
+        """Start rendering the pages of `nodes` that aren't cached yet."""
+        for node in nodes:
+            if node.id not in self.pages and node.id not in self.pending:
+                self.pending[node.id] = self.executor.submit(self.render, node)
+
+    def poll(self):
+        """Take in the pages rendered so far."""
+        for node_id, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[node_id]
+                self.store(node_id, future.result().convert())
+
+    def cache_clear(self):
+        """Drop every page, e.g. when the language changes."""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.pages.clear()
+
+    def store(self, node_id, page):
+        self.pages[node_id] = page
+        self.pages.move_to_end(node_id)
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+
+    def page(self, node):
+        """The page of `node`, or None until `poll` takes it in (it is
+        queued if it wasn't already); never waits for the worker."""
+        page = self.pages.get(node.id)
+        if page is not None:
+            self.pages.move_to_end(node.id)
+            return page
+
+        self.prefetch([node])
+        return None
+
+
+@functools.lru_cache
+def page_renderer():
+    """The renderer shared by dialogs, so their pages outlive them."""
+    return PageRenderer()
+
+
+class Dialog:
+    """A conversation through a dialog graph, drawn as a box at the bottom
+    of the screen.
+
+    Left and right page through `back`/`next`, up and down pick a response
+    and accept follows it (or the next page). The dialog stops running when
+    it reaches a node or response that leads nowhere.
+    """
+
+    PADDING = 8
+    BACKGROUND = (20, 20, 40, 255)
+
+    def __init__(self, start="0", nodes=None, renderer=None):
+        self.nodes = load_dialogs() if nodes is None else nodes
+        self.renderer = page_renderer() if renderer is None else renderer
+        self.node = None
+        # the last page drawn, shown while the current one is rendering
+        self.shown = None
+        self.selected = 0
+        self.running = True
+        self.open(self.nodes[start] if isinstance(start, str) else start)
+
+    def open(self, node):
+        if node is None:
+            self.close()
+            return
+
+        self.node = node
+        self.selected = 0
+        # render where the player can go from here while they read
+        self.renderer.prefetch([node, *node.neighbours()])
+
+    def close(self):
+        self.node = None
+        self.running = False
+
+    def choose(self, index):
+        response = self.node.responses[index]
+        game_data["dialogResponses"][self.node.id] = index
+        self.open(response.next)
+
+    def handle_event(self, event):
+        if not self.running or event.type != pygame.KEYDOWN:
+            return
+
+        node = self.node
+        if event.key in (LEFT, pygame.K_LEFT) and node.back:
+            self.open(node.back)
+        elif event.key in (RIGHT, pygame.K_RIGHT) and node.next:
+            self.open(node.next)
+        elif event.key in (UP, pygame.K_UP) and node.responses:
+            self.selected = (self.selected - 1) % len(node.responses)
+        elif event.key in (DOWN, pygame.K_DOWN) and node.responses:
+            self.selected = (self.selected + 1) % len(node.responses)
+        elif event.key == ACCEPT:
+            if node.responses:
+                self.choose(self.selected)
+            else:
+                self.open(node.next)
+
+    def draw(self, surface):
+        self.renderer.poll()
+        if not self.running:
+            return
+
+        page = self.renderer.page(self.node)
+        if page is None:
+            page = self.shown
+        else:
+            self.shown = page
+
+        padding = self.PADDING
+        height = self.renderer.line_height if page is None else page.height
+        box = pygame.Rect(0, 0, self.renderer.width + 2 * padding, height + 2 * padding)
+        box.midbottom = (surface.get_width() // 2, surface.get_height() - padding)
+        pygame.draw.rect(surface, self.BACKGROUND, box)
+        pygame.draw.rect(surface, WHITE, box, 1)
+        if page is None:
+            return
+
+        x = box.x + padding
+        y = box.y + padding
+        blits = [(page.body, (x, y))]
+        y += page.body.get_height()
+        for i, (normal, selected) in enumerate(page.responses):
+            blits.append((selected if i == self.selected else normal, (x, y)))
+            y += normal.get_height()
+        surface.blits(blits, doreturn=False)
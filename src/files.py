@@ -0,0 +1,17 @@
+"""Helpers shared by the compiled file formats (maps, language catalogs).
+
+Nothing here touches pygame, so the compilers can run without a window.
+"""
+import json
+
+
+ALIGN = 8
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def aligned(size, align=ALIGN):
+    return -(-size // align) * align
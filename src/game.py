@@ -1,48 +1,105 @@
+import time
+
 from src.globals import *
 from src.utils import *
+from src.profiler import profiler
+from src.collisions import PLAYER, resolve_contacts
+from src.dialog import Dialog
+from src.sprites import frame_table
+from src.spatial import ActorIndex, ActorList, SolidGrid
 
 
 class Game:
     def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start over with no map and no actors. `game` is imported all over,
+        so it is reset in place rather than replaced."""
         self.game_mode = None
+        self.render_mode = None
         self.cam_x = 0
         self.cam_y = 0
+        self.prev_cam_x = 0
+        self.prev_cam_y = 0
+        # how far rendering is between the last two simulation ticks (0-1)
+        self.alpha = 1.0
         self.map = None
         self.game_player = None
         self.uw = 500
         self.uh = 500
         self.debug_mode = False
-        self.actor = {"None": []}
+        self.actor = {"None": ActorList()}
+        # actor id -> name of the layer the actor is in
+        self.actor_layer = {}
+        # actors destroyed this tick, removed once it ends
+        self.destroyed = []
+        self.actor_index = {"None": ActorIndex()}
+        # how far (in px) outside the screen actors are still drawn and
+        # sleeping actors are still run
+        self.cull_margin = 32
+        self.active_margin = 128
+        # destroyed actors by type, recycled by spawn
         self.unused_actors = {}
+        self.solid_grid = SolidGrid()
         self.attacks = []
         self.health = 100
         self.hurt_timer = 0
-        self.frame = []
+        self.frame = ()
+        # the open dialog, if any
+        self.dialog = None
 
-    def load_sprite(self, sprite):
-        sprite_size = sprite.get_size()
-        sprite_w = int(sprite_size[0])
-        sprite_h = int(sprite_size[1])
+    def view_rect(self, margin=0):
+        return pygame.Rect(
+            self.cam_x - margin,
+            self.cam_y - margin,
+            DISP_WID + 2 * margin,
+            DISP_HEI + 2 * margin,
+        )
 
-        for i in range(0, int(sprite_h / 16)):
-            for j in range(0, int(sprite_w / 16)):
-                self.frame.append((j * 16, i * 16, 16, 16))
+    def camera(self):
+        """Camera position interpolated between the last two ticks."""
+        return (
+            self.prev_cam_x + (self.cam_x - self.prev_cam_x) * self.alpha,
+            self.prev_cam_y + (self.cam_y - self.prev_cam_y) * self.alpha,
+        )
 
+    def load_sprite(self, sprite):
+        self.frame = frame_table(sprite).rects
         return self.frame
 
-    def run(self):
+    def tick(self):
         if self.hurt_timer > 0:
             self.hurt_timer -= 1
 
-        draw_text(font, 20, 20, str(round(clock.get_fps(), 1)), RED)
+    def run(self):
+        draw_text(get_font(40), 20, 20, str(round(clock.get_fps(), 1)), RED)
+
+        if self.dialog is not None:
+            self.dialog.draw(display)
+            if not self.dialog.running:
+                self.dialog = None
+
+        if self.debug_mode:
+            profiler.draw(display, get_font(8), 4, 64)
 
 
 class Map:
     def __init__(self, _a):
+        self.a = _a
+        self.reset()
+
+    def reset(self):
         self.actlast = 0
         self.actor = []
         self.actor_empty = {}
-        self.a = _a
+
+
+def reset_game():
+    """Drop every actor, pool and the loaded map's state, e.g. to load a map
+    again from scratch."""
+    game.reset()
+    game_map.reset()
 
 
 game = Game()
@@ -88,26 +145,195 @@ map_dict = [
 ]
 
 
-def new_actor(actor_type, x, y, arr=None, layer="None"):
-    na = actor_type(x, y, arr)
+def spawn(actor_type, x, y, arr=None, layer="None"):
+    """Create an actor in `layer` and return it.
+
+    Actors go through spawn -> (deactivate -> activate) -> destroy. Every
+    actor gets a new id from `game_map.actlast`, even a recycled one, so an
+    id never refers to two actors.
+    """
+    # reuse a destroyed actor of the same type before allocating a new one
+    pool = game.unused_actors.get(actor_type)
+    if pool:
+        na = pool.pop()
+        na.reset(x, y, arr)
+    else:
+        na = actor_type(x, y, arr)
+
     na.id = game_map.actlast
+    na.alive = True
+    na.active = True
     game.actor[layer].append(na)
+    game.actor_index[layer].add(na)
+    game.actor_layer[na.id] = layer
+    # solid actors collide from whatever layer they are in, e.g. the blocks
+    # of an object layer
+    if na.solid:
+        game.solid_grid.add(na)
+    # the player is whichever was spawned last, never one waiting in a pool
+    if na.tags & PLAYER:
+        game.game_player = na
     game_map.actlast += 1
+    return na
+
+
+def open_dialog(start="0"):
+    """Show the dialog starting at node `start` of res/text/dialogs.json."""
+    game.dialog = Dialog(start)
+    return game.dialog
+
+
+# the original name, used all over
+new_actor = spawn
+
+
+def find_actor(actor_id):
+    """The live actor with `actor_id`, or None."""
+    layer = game.actor_layer.get(actor_id)
+    return None if layer is None else game.actor[layer].get(actor_id)
+
+
+def deactivate(actor):
+    """Stop running, drawing and colliding with an actor, keeping it in its layer."""
+    if actor.active:
+        actor.active = False
+        game.actor_index[game.actor_layer[actor.id]].remove(actor)
+        if actor in game.solid_grid.dynamic:
+            game.solid_grid.remove(actor)
+
+
+def moved(actor):
+    """Refile an actor in its layer's index after something other than its
+    own `run` moved it (another actor, a contact handler...), so it is
+    culled and woken up where it is now."""
+    if actor.active:
+        game.actor_index[game.actor_layer[actor.id]].update(actor)
+
+
+def activate(actor):
+    if actor.alive and not actor.active:
+        actor.active = True
+        game.actor_index[game.actor_layer[actor.id]].add(actor)
+        if actor.solid:
+            game.solid_grid.add(actor)
+
+
+def destroy(actor):
+    """Remove an actor from the game at the end of the current tick.
+
+    It stops running at once, its `destructor` is called when it is removed,
+    and the instance is kept for `spawn` to reuse.
+    """
+    if actor.alive:
+        actor.alive = False
+        game.destroyed.append(actor)
+
+
+def remove_destroyed():
+    for actor in game.destroyed:
+        # also takes solid actors out of the solid grid
+        deactivate(actor)
+        game.actor[game.actor_layer.pop(actor.id)].remove(actor)
+
+        actor.destructor()
+        game.unused_actors.setdefault(type(actor), []).append(actor)
+
+    game.destroyed.clear()
+
+
+def prewarm(actor_type, count, arr=None):
+    """Fill the pool of `actor_type` up to `count` actors, e.g. ahead of a wave
+    of enemies, so spawning them later doesn't allocate."""
+    pool = game.unused_actors.setdefault(actor_type, [])
+    while len(pool) < count:
+        pool.append(actor_type(0, 0, arr))
 
 
 def run_actors():
-    for i in game.actor.values():
-        for j in i:
-            j.render()
+    """Run the awake actors; returns those of them that have tags."""
+    area = game.view_rect(game.active_margin)
+    timed = profiler.enabled
+    tagged = []
 
-            if game.debug_mode:
-                j.debug()
+    for index in game.actor_index.values():
+        batches = {}
 
-            j.run()
+        for j in index.awake(area):
+            if not j.alive:
+                continue
 
+            j.prev_x = j.x
+            j.prev_y = j.y
+            if j.tags:
+                tagged.append(j)
 
-def game_play():
+            # actors with a batch system are run all together after the rest
+            if j.batch is not None:
+                batches.setdefault(j.batch, []).append(j)
+                continue
+
+            if timed:
+                start = time.perf_counter()
+                j.run()
+                profiler.add("run " + type(j).__name__, time.perf_counter() - start)
+            else:
+                j.run()
+
+            # its own moves; anything else that moves an actor calls moved()
+            index.update(j)
+
+        for system, actors in batches.items():
+            if timed:
+                start = time.perf_counter()
+                system.run(actors)
+                profiler.add(
+                    "run " + type(actors[0]).__name__, time.perf_counter() - start
+                )
+            else:
+                system.run(actors)
+
+            for j in actors:
+                index.update(j)
+
+    return tagged
+
+
+def update_camera():
+    game.prev_cam_x = game.cam_x
+    game.prev_cam_y = game.cam_y
+    game.cam_x = game.game_player.shape.x - (DISP_WID / 2) + game.game_player.w / 2
+    game.cam_y = game.game_player.shape.y - (DISP_HEI / 2) + game.game_player.h / 2
+
+
+def render_queue():
+    """Visible actors in draw order: by layer, then by z-index, then spawn order."""
+    view = game.view_rect(game.cull_margin)
+    queue = []
+
+    for index in game.actor_index.values():
+        queue.extend(index.visible(view))
+
+    return queue
+
+
+def render_actors():
+    queue = render_queue()
+
+    for j in queue:
+        j.render()
+
+    flush_sprites()
+
+    if game.debug_mode:
+        for j in queue:
+            j.debug()
+
+
+def game_update():
+    """Advance the simulation by one fixed tick."""
     if game:
+        game.tick()
+
         # 1) UPDATE PHASE
         #
         # Create, update, and destroy actors
@@ -115,7 +341,14 @@ def game_play():
         #   Each actor must update its current state based on what's going on
         #   Some actors might "die" (be killed or despawn) and be removed from the game
 
-        run_actors()
+        with profiler.section("update"):
+            tagged = run_actors()
+
+        with profiler.section("contacts"):
+            for j in resolve_contacts(tagged):
+                moved(j)
+
+        remove_destroyed()
 
         # 2) CAMERA PHASE
         #
@@ -131,9 +364,13 @@ def game_play():
         # of the camera.
         # Visual effects such as screen-shake may also cause the camera's position to change.
 
-        game.cam_x = game.game_player.shape.x - (DISP_WID / 2) + game.game_player.w / 2
-        game.cam_y = game.game_player.shape.y - (DISP_HEI / 2) + game.game_player.h / 2
+        with profiler.section("camera"):
+            update_camera()
 
+
+def game_render():
+    """Draw the current state, interpolated by `game.alpha` between the last two ticks."""
+    if game:
         # 3) RENDER PHASE
         #
         # Render each actor and whatever else (e.g. particle effects, etc) needs to be rendered.
@@ -152,4 +389,10 @@ def game_play():
         # (Note that the order in which objects are rendered does not necessarily need to be the same order
         # in which we invoke the run() method.)
 
-        # render_actors()
+        with profiler.section("render"):
+            render_actors()
+
+
+def game_play():
+    game_update()
+    game_render()
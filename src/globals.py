@@ -1,3 +1,14 @@
+import os
+
+# Headless mode renders to an offscreen display with SDL's dummy drivers,
+# for benchmarks and automated runs. It must be set up before pygame.init().
+# DIM_TROUBLE_HEADLESS=1 turns it on; unset, empty or 0 leave it off.
+HEADLESS = os.environ.get("DIM_TROUBLE_HEADLESS") not in (None, "", "0")
+
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
 import pygame
 
 
@@ -5,13 +16,16 @@ pygame.init()
 
 
 __all__ = [
+    "HEADLESS",
     "DISP_ICO",
     "DISP_WID",
     "DISP_HEI",
     "DISP_TIT",
     "display",
-    "font",
+    "DEFAULT_FONT",
     "FPS",
+    "TICK_RATE",
+    "MAX_FRAME_SKIP",
     "clock",
     "config",
     "UP",
@@ -21,7 +35,8 @@ __all__ = [
     "PAUSE",
     "ACCEPT",
     "BACKGROUND",
-    "JUMP"
+    "JUMP",
+    "DEBUG",
 ]
 
 
@@ -32,15 +47,20 @@ DISP_HEI = 240
 DISP_TIT = "Dimensional Trouble Temporary Title"
 DISP_ICO = "icon/path/still/to/determine"
 
-font = pygame.font.Font("data/fonts/dogica.ttf", 40)
+# fonts are opened on first use, see src.utils.get_font
+DEFAULT_FONT = "data/fonts/dogica.ttf"
 
 pygame.display.set_caption(DISP_TIT)
 
 display = pygame.display.set_mode(
-    (DISP_WID, DISP_HEI), pygame.RESIZABLE | pygame.SCALED
+    (DISP_WID, DISP_HEI), 0 if HEADLESS else pygame.RESIZABLE | pygame.SCALED
 )
 
 FPS = 60
+# simulation ticks per second, independent from the frame rate
+TICK_RATE = 60
+# ticks simulated at most per rendered frame before the game slows down instead
+MAX_FRAME_SKIP = 5
 clock = pygame.time.Clock()
 game_mode = None
 
@@ -54,7 +74,8 @@ config = {
         "right": pygame.K_d,
         "pause": pygame.K_ESCAPE,
         "accept": pygame.K_RETURN,
-        "jump": pygame.K_SPACE
+        "jump": pygame.K_SPACE,
+        "debug": pygame.K_F3,
     }
 }
 
@@ -65,6 +86,7 @@ DOWN = config["key"]["down"]
 PAUSE = config["key"]["pause"]
 ACCEPT = config["key"]["accept"]
 JUMP = config["key"]["jump"]
+DEBUG = config["key"]["debug"]
 
 ######################## Game Data ########################
 
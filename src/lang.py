@@ -0,0 +1,293 @@
+"""Translated strings.
+
+The languages are listed in res/lang/languages.json and the strings of
+each are kept in res/lang/<code>.json, a flat object of key -> string.
+`compile_catalog` turns one into a binary table: the keys sorted, with an
+index of their offsets, so `Catalog` can memory-map it and find a string
+by binary search without reading, let alone parsing, the rest. Only the
+catalogs of the current and the default language are open, and only the
+strings looked up get decoded.
+
+`tr(key, default)` is the string of `key` in the current language. The
+game picks the language with `lang.use` at startup, on the main thread
+and before anything else looks strings up; `tr` never changes it, so it
+is safe to call from other threads.
+Caches of anything drawn from translated strings (keyed by string key,
+not by the text itself) register with `lang.register_cache`, and are
+cleared whenever the language changes.
+Catalogs are compiled on first use if they are missing or out of date, or
+ahead of time:
+
+    python -m src.lang
+"""
+import argparse
+import mmap
+import os
+import struct
+import threading
+
+from src.files import aligned, load_json
+
+
+LANG_DIR = "res/lang"
+LANGUAGES_PATH = os.path.join(LANG_DIR, "languages.json")
+COMPILED_DIR = os.path.join(LANG_DIR, "compiled")
+
+MAGIC = b"DTLNG"
+VERSION = 1
+# magic, version, number of strings, source mtime, source size
+PREAMBLE = struct.Struct("<5sBIqQ")
+# key offset, key length, value offset, value length (from the start of
+# the strings)
+ENTRY = struct.Struct("<4I")
+
+
+class CatalogFormatError(Exception):
+    pass
+
+
+def source_path(code, lang_dir=LANG_DIR):
+    return os.path.join(lang_dir, code + ".json")
+
+
+def compiled_path(code, compiled_dir=COMPILED_DIR):
+    return os.path.join(compiled_dir, code + ".dtl")
+
+
+def compile_catalog(source, out_path):
+    """Compile the JSON catalog at `source` and return the path written."""
+    strings = load_json(source)
+    if not isinstance(strings, dict) or not all(
+        isinstance(i, str) for i in strings.values()
+    ):
+        raise CatalogFormatError(f"{source} must be an object of key -> string")
+    stat = os.stat(source)
+
+    index = []
+    blob = bytearray()
+    for key, value in sorted((k.encode(), v.encode()) for k, v in strings.items()):
+        index.append(ENTRY.pack(len(blob), len(key), len(blob) + len(key), len(value)))
+        blob += key + value
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    temp_path = out_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(
+            PREAMBLE.pack(MAGIC, VERSION, len(index), stat.st_mtime_ns, stat.st_size)
+        )
+        file.write(b"\0" * (aligned(file.tell()) - file.tell()))
+        file.write(b"".join(index))
+        file.write(blob)
+    os.replace(temp_path, out_path)
+
+    return out_path
+
+
+def read_preamble(file):
+    magic, version, count, mtime, size = PREAMBLE.unpack(file.read(PREAMBLE.size))
+    if magic != MAGIC or version != VERSION:
+        raise CatalogFormatError(f"{file.name} is not a version {VERSION} catalog")
+    return count, mtime, size
+
+
+def is_fresh(source, path):
+    """Whether the catalog at `path` was compiled from the current `source`."""
+    try:
+        with open(path, "rb") as file:
+            _, mtime, size = read_preamble(file)
+        stat = os.stat(source)
+    except (OSError, struct.error, CatalogFormatError):
+        return False
+
+    return mtime == stat.st_mtime_ns and size == stat.st_size
+
+
+class Catalog:
+    """A compiled catalog, memory-mapped until `close`. Strings are decoded
+    when first looked up and kept."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.count = read_preamble(file)[0]
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = aligned(PREAMBLE.size)
+        self.strings_start = self.index + self.count * ENTRY.size
+        self.strings = {}
+        # the dialog renderer looks strings up on its own thread, which
+        # mustn't find the mapping closed halfway through a search
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def find(self, key):
+        """Binary search the index for `key`; returns its value's bytes or None."""
+        target = key.encode()
+        data = self.data
+        start = self.strings_start
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, value_offset, value_length = ENTRY.unpack_from(
+                data, self.index + middle * ENTRY.size
+            )
+            probe = data[start + key_offset : start + key_offset + key_length]
+            if probe < target:
+                low = middle + 1
+            elif probe > target:
+                high = middle
+            else:
+                return data[start + value_offset : start + value_offset + value_length]
+        return None
+
+    def get(self, key, default=None):
+        value = self.strings.get(key)
+        if value is None:
+            with self.lock:
+                found = self.find(key)
+            if found is None:
+                return default
+            value = self.strings[key] = found.decode()
+        return value
+
+    def close(self):
+        with self.lock:
+            self.count = 0
+            self.data.close()
+        self.strings.clear()
+
+
+class MemoryCatalog(dict):
+    """The strings of a catalog that couldn't be compiled, kept in memory."""
+
+    def close(self):
+        self.clear()
+
+
+def open_catalog(code, lang_dir=LANG_DIR, compiled_dir=COMPILED_DIR):
+    """The catalog of language `code`, compiling it first if needed, or
+    None if the language has no strings file."""
+    source = source_path(code, lang_dir)
+    if not os.path.exists(source):
+        return None
+
+    out_path = compiled_path(code, compiled_dir)
+    if not is_fresh(source, out_path):
+        try:
+            compile_catalog(source, out_path)
+        except OSError:
+            # e.g. a read only install
+            return MemoryCatalog(load_json(source))
+
+    return Catalog(out_path)
+
+
+class Localization:
+    """The current language and its catalog.
+
+    The first language listed is the default. Until `use` picks a language
+    nothing is translated. Keys a language lacks are looked up in the default
+    language, then fall back to the default given to `tr`, then to the key.
+    """
+
+    def __init__(
+        self, languages_path=LANGUAGES_PATH, lang_dir=LANG_DIR, compiled_dir=COMPILED_DIR
+    ):
+        self.languages_path = languages_path
+        self.lang_dir = lang_dir
+        self.compiled_dir = compiled_dir
+        self._languages = None
+        self.language = None
+        self.catalog = None
+        # the default language's catalog, while another one is in use
+        self.fallback = None
+        self.caches = []
+
+    @property
+    def languages(self):
+        """Code -> name of every language, in the order listed."""
+        if self._languages is None:
+            self._languages = dict(load_json(self.languages_path)["languages"])
+        return self._languages
+
+    def register_cache(self, cache):
+        """Have `cache.cache_clear()` called on language changes.
+
+        Returns `cache`, so it can be used as a decorator over
+        `functools.lru_cache`.
+        """
+        self.caches.append(cache)
+        return cache
+
+    def use(self, code):
+        if code not in self.languages:
+            raise ValueError(f"unknown language {code!r}")
+        if code == self.language:
+            return
+
+        default = self.default
+        current, fallback = self.catalog, self.fallback
+        if code == default:
+            # the default catalog is open already as the fallback, if any
+            if fallback is None:
+                fallback = open_catalog(code, self.lang_dir, self.compiled_dir)
+            self.catalog = fallback
+            self.fallback = fallback = None
+        else:
+            self.catalog = open_catalog(code, self.lang_dir, self.compiled_dir)
+            if self.language == default:
+                self.fallback, current = current, None
+            elif fallback is None:
+                self.fallback = open_catalog(default, self.lang_dir, self.compiled_dir)
+            else:
+                fallback = None
+        self.language = code
+
+        for catalog in (current, fallback):
+            if catalog is not None:
+                catalog.close()
+
+        for cache in self.caches:
+            cache.cache_clear()
+
+    @property
+    def default(self):
+        return next(iter(self.languages))
+
+    def tr(self, key, default=None):
+        value = None if self.catalog is None else self.catalog.get(key)
+        if value is None and self.fallback is not None:
+            value = self.fallback.get(key)
+        if value is None:
+            return key if default is None else default
+        return value
+
+
+lang = Localization()
+
+
+def tr(key, default=None):
+    """The string of `key` in the current language."""
+    return lang.tr(key, default)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the language catalogs.")
+    parser.add_argument("languages", nargs="*", help="defaults to every language listed")
+    parser.add_argument("--out", default=COMPILED_DIR)
+    args = parser.parse_args()
+
+    for code in args.languages or lang.languages:
+        source = source_path(code)
+        if not os.path.exists(source):
+            print(f"{code}: no {source}, skipped")
+            continue
+        out_path = compile_catalog(source, compiled_path(code, args.out))
+        print(f"{source} -> {out_path} ({os.path.getsize(out_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
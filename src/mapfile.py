@@ -0,0 +1,191 @@
+"""Precompiled binary maps.
+
+Parsing a Tiled JSON map means parsing every tile of every layer as text,
+which stalls level loads. `compile_map` writes a map as a small JSON
+header (map properties, tileset table, object layers) followed by the raw
+tile arrays of its tile layers (or of their chunks, in infinite maps),
+which `read_map` loads with `numpy.fromfile` without parsing them, or
+memory-maps so that only the parts of the map in use are ever read.
+
+`load_map` is what the game uses: it loads the compiled copy of a JSON map
+from `COMPILED_DIR`, compiling it first if there is none or the JSON has
+changed since, and falls back to the JSON itself if the copy can't be
+written. Maps can also be compiled ahead of time:
+
+    python -m src.mapfile res/map/*.json
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+
+import numpy
+
+from src.files import aligned, load_json
+
+
+COMPILED_DIR = "res/map/compiled"
+
+MAGIC = b"DTMAP"
+VERSION = 2
+# magic, version, header length
+PREAMBLE = struct.Struct("<5sBI")
+
+
+class MapFormatError(Exception):
+    pass
+
+
+def compiled_path(source, compiled_dir=COMPILED_DIR):
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(compiled_dir, name + ".dtm")
+
+
+def tile_dtype(data):
+    # GIDs carry Tiled's flip flags in their top bits, so only maps without
+    # flipped tiles (and fewer than 65536 tiles) fit 16 bits
+    return "<u2" if max(data, default=0) <= 0xFFFF else "<u4"
+
+
+def compile_map(source, out_path=None):
+    """Compile the Tiled JSON map at `source` and return the path written."""
+    out_path = out_path or compiled_path(source)
+    mapdata = load_json(source)
+    stat = os.stat(source)
+
+    arrays = []
+    layers = []
+    for layer in mapdata["layers"]:
+        layer = dict(layer)
+        if isinstance(layer.get("data"), list):
+            data = layer.pop("data")
+            arrays.append((len(layers), -1, numpy.asarray(data, tile_dtype(data))))
+
+        # the chunks of infinite maps
+        if "chunks" in layer:
+            layer["chunks"] = [dict(i) for i in layer["chunks"]]
+            for chunk_index, chunk in enumerate(layer["chunks"]):
+                if isinstance(chunk.get("data"), list):
+                    data = chunk.pop("data")
+                    arrays.append(
+                        (len(layers), chunk_index, numpy.asarray(data, tile_dtype(data)))
+                    )
+        layers.append(layer)
+
+    header = {
+        "source_mtime": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "map": dict(mapdata, layers=layers),
+        # layer index, chunk index (-1 for the layer's own data), dtype,
+        # length and offset from the start of the data
+        "arrays": [],
+    }
+    offset = 0
+    for layer_index, chunk_index, array in arrays:
+        header["arrays"].append(
+            [layer_index, chunk_index, array.dtype.str, len(array), offset]
+        )
+        offset += aligned(array.nbytes)
+
+    blob = encode(header)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    temp_path = out_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, len(blob)))
+        file.write(blob)
+        for _, _, array in arrays:
+            file.write(b"\0" * (aligned(file.tell()) - file.tell()))
+            file.write(array.tobytes())
+    # replace the old copy in one step, so a failed write never leaves a
+    # truncated map behind
+    os.replace(temp_path, out_path)
+
+    return out_path
+
+
+def encode(header):
+    return json.dumps(header, separators=(",", ":")).encode()
+
+
+def read_header(file):
+    magic, version, length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+    if magic != MAGIC or version != VERSION:
+        raise MapFormatError(f"{file.name} is not a version {VERSION} compiled map")
+    return json.loads(file.read(length))
+
+
+def read_map(path, memory_map=False):
+    """Load a compiled map; tile layer data comes back as numpy arrays.
+
+    With `memory_map` the arrays are views of the file mapped into memory, which
+    the OS reads in as they are used. The file then stays open as long as
+    they are around, so on Windows the map can't be recompiled in the
+    meantime (`load_map` falls back to the JSON if so).
+    """
+    with open(path, "rb") as file:
+        header = read_header(file)
+        data_start = aligned(file.tell())
+        mapdata = header["map"]
+        if memory_map and header["arrays"]:
+            # the arrays keep the mapping alive after the file is closed
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        for layer_index, chunk_index, dtype, count, offset in header["arrays"]:
+            layer = mapdata["layers"][layer_index]
+            if chunk_index >= 0:
+                layer = layer["chunks"][chunk_index]
+            if memory_map:
+                layer["data"] = numpy.frombuffer(data, dtype, count, data_start + offset)
+            else:
+                file.seek(data_start + offset)
+                layer["data"] = numpy.fromfile(file, dtype, count)
+
+    return mapdata
+
+
+def is_fresh(source, path):
+    """Whether the compiled map at `path` was built from the current `source`."""
+    try:
+        with open(path, "rb") as file:
+            header = read_header(file)
+        stat = os.stat(source)
+    except (OSError, ValueError, struct.error, MapFormatError):
+        return False
+
+    return (
+        header["source_mtime"] == stat.st_mtime_ns
+        and header["source_size"] == stat.st_size
+    )
+
+
+def load_map(path, compiled_dir=COMPILED_DIR, memory_map=False):
+    """Load a map, through its compiled copy when it is a Tiled JSON map."""
+    if not path.endswith(".json"):
+        return read_map(path, memory_map)
+
+    out_path = compiled_path(path, compiled_dir)
+    if not is_fresh(path, out_path):
+        try:
+            compile_map(path, out_path)
+        except OSError:
+            # e.g. a read only install: parse the JSON every time instead
+            return load_json(path)
+
+    return read_map(out_path, memory_map)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile Tiled JSON maps.")
+    parser.add_argument("maps", nargs="*", help="defaults to every map in res/map")
+    parser.add_argument("--out", default=COMPILED_DIR)
+    args = parser.parse_args()
+
+    for source in args.maps or sorted(glob.glob("res/map/*.json")):
+        out_path = compile_map(source, compiled_path(source, args.out))
+        print(f"{source} -> {out_path} ({os.path.getsize(out_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,24 @@ from itertools import cycle
 import pygame
 
 from src.globals import FPS, BACKGROUND, DISP_WID, DISP_HEI
-from src.utils import text, load_json
+from src.lang import lang
+from src.utils import tr_text, load_json
 
 from src.button import Button
 
 
 class Menu:
+    """A screen of buttons.
+
+    Only what changed is drawn again: buttons whose look changed (hover,
+    click, label) and the areas `dirty_rects` returns, and only those areas
+    are passed to `pygame.display.update`. While nothing is going on the
+    loop sleeps in `pygame.event.wait` instead of redrawing every frame.
+    """
+
     BACKGROUND = BACKGROUND
+    # window events after which the whole screen has to be drawn again
+    REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE, pygame.WINDOWEXPOSED)
 
     def __init__(self, screen: pygame.Surface, clock: pygame.time.Clock, buttons):
         self.screen = screen
@@ -19,6 +30,8 @@ class Menu:
         self.buttons = buttons
         self.dt = 0
         self.running = True
+        self.full_redraw = True
+        self.language = None
 
     def handle_events(self, events=None):
         if events is None:
@@ -26,22 +39,64 @@ class Menu:
         for event in events:
             if event.type == pygame.QUIT:
                 sys.exit()
+            if event.type in self.REDRAW_EVENTS:
+                self.full_redraw = True
 
             for button in sorted(self.buttons, key=attrgetter("rect.right")):
-                button.handle_event(event)
-
-    def draw(self):
+                # a click can do anything to the screen, e.g. run a game on it
+                if button.handle_event(event):
+                    self.full_redraw = True
+
+    def wait_events(self):
+        """Wait for events, or until `timeout` runs out, and return them."""
+        timeout = self.timeout()
+        event = pygame.event.wait() if timeout is None else pygame.event.wait(timeout)
+        events = pygame.event.get()
+        if event.type != pygame.NOEVENT:
+            events.insert(0, event)
+        return events
+
+    def timeout(self):
+        """Milliseconds until something has to be drawn without any event
+        (e.g. the next animation frame), or None."""
+        return None
+
+    def dirty_rects(self):
+        """Areas that changed by themselves since the last draw."""
+        return []
+
+    def draw_scene(self):
         self.screen.fill(self.BACKGROUND)
         for button in sorted(self.buttons, key=attrgetter("rect.left")):
             button.draw(self.screen)
-        pygame.display.update()
+
+    def draw(self):
+        if self.full_redraw or self.language != lang.language:
+            self.full_redraw = False
+            self.dirty_rects()
+            self.draw_scene()
+            # drawing may have loaded the first language
+            self.language = lang.language
+            pygame.display.update()
+            return
+
+        screen_rect = self.screen.get_rect()
+        rects = [i.dirty_area() for i in self.buttons if i.dirty] + self.dirty_rects()
+        rects = [i.clip(screen_rect) for i in rects]
+        for rect in rects:
+            self.screen.set_clip(rect)
+            self.draw_scene()
+        self.screen.set_clip(None)
+
+        if rects:
+            pygame.display.update(rects)
 
     def update(self):
         self.dt = self.clock.tick(FPS)
 
     def loop(self):
         while self.running:
-            self.handle_events()
+            self.handle_events(self.wait_events())
             self.draw()
             self.update()
 
@@ -50,8 +105,12 @@ class Menu:
 
 
 class MainMenu(Menu):
-    TITLE = text("EVOLUTIONIST", (30, 100, 30), 150)
-    AUTHORS = text("by Emc235 & bydariogamer", (250, 40, 40), 30)
+    # (string key, color, size), drawn in the current language
+    TITLE = ("menu.title", (30, 100, 30), 150)
+    AUTHORS = ("menu.authors", (250, 40, 40), 30)
+    ANIMATION_RECT = pygame.Rect(800, 250, 300, 300)
+    # the slime animation shows a frame for 4 frames at FPS
+    FRAME_TIME = 4 * 1000 // FPS
 
     def __init__(
         self,
@@ -64,13 +123,13 @@ class MainMenu(Menu):
                 Button(
                     (0, H / 2, 600, 100),
                     color=(100, 100, 250),
-                    label="PLAY",
+                    label="menu.play",
                     on_click=[lambda _: Game(screen, clock).run()],
                 ),
                 Button(
                     (0, H / 2 + 130, 600, 100),
                     color=(100, 100, 250),
-                    label="EXIT",
+                    label="menu.exit",
                     on_click=[Button.put_exit],
                 ),
             ]
@@ -84,16 +143,25 @@ class MainMenu(Menu):
             for i in range(1, 9)
         ]
         self.animation = cycle(frames)
-        self.animation_limiter = cycle(range(4))
         self.last_anim = next(self.animation)
+        self.next_frame = pygame.time.get_ticks() + self.FRAME_TIME
 
-    def draw(self):
+    def timeout(self):
+        return max(self.next_frame - pygame.time.get_ticks(), 1)
+
+    def dirty_rects(self):
+        now = pygame.time.get_ticks()
+        if now < self.next_frame:
+            return []
+
+        self.last_anim = next(self.animation)
+        self.next_frame = now + self.FRAME_TIME
+        return [self.ANIMATION_RECT.copy()]
+
+    def draw_scene(self):
         self.screen.fill(self.BACKGROUND)
-        self.screen.blit(self.TITLE, (15, 50))
-        self.screen.blit(self.AUTHORS, (50, 230))
-        if not next(self.animation_limiter):
-            self.last_anim = next(self.animation)
-        self.screen.blit(self.last_anim, (800, 250))
+        self.screen.blit(tr_text(*self.TITLE), (15, 50))
+        self.screen.blit(tr_text(*self.AUTHORS), (50, 230))
+        self.screen.blit(self.last_anim, self.ANIMATION_RECT)
         for button in self.buttons:
             button.draw(self.screen)
-        pygame.display.update()
@@ -0,0 +1,133 @@
+import csv
+import json
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import pygame
+
+from src.text import glyphs
+
+
+class Profiler:
+    """Times the phases of each frame and keeps rolling statistics.
+
+    Phases are timed with `section` (or `add` in hot paths) and summed per
+    frame; `end_frame` pushes the frame's totals into a window of the last
+    `window` frames, from which min/avg/p99 are computed. With `record` set
+    every frame is also kept so the whole run can be written out with `dump`.
+    """
+
+    def __init__(self, window=240):
+        self.enabled = False
+        self.record = False
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.current = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.trace = []
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.current[name] += seconds
+        self.calls[name] += 1
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+
+        for name, seconds in self.current.items():
+            self.samples[name].append(seconds)
+
+        if self.record:
+            self.trace.append(dict(self.current))
+
+        self.current = defaultdict(float)
+
+    def reset(self):
+        self.samples.clear()
+        self.current = defaultdict(float)
+        self.calls.clear()
+        self.trace = []
+
+    def stats(self, name):
+        """Return `(min, avg, p99)` of a phase over the window, in ms."""
+        samples = sorted(self.samples[name])
+        if not samples:
+            return 0.0, 0.0, 0.0
+
+        return (
+            samples[0] * 1000,
+            sum(samples) / len(samples) * 1000,
+            samples[int((len(samples) - 1) * 0.99)] * 1000,
+        )
+
+    def totals(self):
+        """Total time of every phase over the recorded trace, in ms."""
+        totals = defaultdict(float)
+        for frame in self.trace:
+            for name, seconds in frame.items():
+                totals[name] += seconds * 1000
+        return dict(totals)
+
+    def draw(self, surface, font, x=4, y=4, color=(255, 255, 255)):
+        line_height = font.get_linesize() + 2
+        phases = [i for i in self.samples if not i.startswith("run ")]
+        # per actor class costs, most expensive first
+        classes = sorted(
+            (i for i in self.samples if i.startswith("run ")),
+            key=lambda i: -self.stats(i)[1],
+        )[:5]
+
+        lines = ["phase       min    avg    p99 ms"] + [
+            "{:<9} {:6.2f} {:6.2f} {:6.2f}".format(name[:9], *self.stats(name))
+            for name in phases + classes
+        ]
+
+        # the numbers change every frame, so draw them from cached glyphs
+        cache = glyphs(font, color, False)
+        background = pygame.Surface(
+            (max(cache.width(i) for i in lines) + 4, line_height * len(lines) + 4)
+        )
+        background.set_alpha(160)
+        surface.blit(background, (x - 2, y - 2))
+
+        blits = []
+        for i, line in enumerate(lines):
+            blits.extend(cache.blit_list(line, x, y + i * line_height))
+        surface.blits(blits, doreturn=False)
+
+    def dump(self, path):
+        """Write the recorded trace to `path`, as CSV or as JSON by its extension."""
+        names = sorted({name for frame in self.trace for name in frame})
+
+        with open(path, "w", newline="") as file:
+            if str(path).endswith(".csv"):
+                writer = csv.writer(file)
+                writer.writerow(["frame"] + [f"{name} (ms)" for name in names])
+                for i, frame in enumerate(self.trace):
+                    writer.writerow(
+                        [i] + [round(frame.get(name, 0.0) * 1000, 4) for name in names]
+                    )
+            else:
+                json.dump(
+                    [
+                        {name: seconds * 1000 for name, seconds in frame.items()}
+                        for frame in self.trace
+                    ],
+                    file,
+                )
+
+
+profiler = Profiler()
@@ -0,0 +1,455 @@
+from collections import OrderedDict
+import functools
+
+import numpy
+
+from src.tilemap import GID_MASK, STREAM_CACHE
+
+
+# Solid area of each block sort within its 16x16 tile, as (x, y, w, h):
+# full, top half, bottom half, left half and right half. Any other sort is
+# a full block.
+BLOCK_SHAPES = [
+    (0, 0, 16, 16),
+    (0, 0, 16, 8),
+    (0, 8, 16, 8),
+    (0, 0, 8, 16),
+    (8, 0, 8, 16),
+]
+
+
+def block_shape(sort):
+    return BLOCK_SHAPES[sort] if 0 <= sort < len(BLOCK_SHAPES) else BLOCK_SHAPES[0]
+
+
+@functools.lru_cache
+def shape_tables(tile_w, tile_h):
+    """The x, y, w and h of every stored block sort value, scaled to the tile
+    size, as arrays."""
+    shapes = numpy.array(
+        [BLOCK_SHAPES[0]] + [block_shape(i) for i in range(255)], numpy.int32
+    )
+    return (
+        shapes[:, 0] * tile_w // 16,
+        shapes[:, 1] * tile_h // 16,
+        shapes[:, 2] * tile_w // 16,
+        shapes[:, 3] * tile_h // 16,
+    )
+
+
+class SolidGrid:
+    """Static solid tiles of a map, stored as a grid of block sorts.
+
+    `sorts` holds one byte per tile: 0 for empty, otherwise the block sort
+    (see `BLOCK_SHAPES`) plus one. Collisions against it are resolved by
+    arithmetic on the few cells under the probe rect, so static solids need
+    no actor objects at all. Solid actors (e.g. the moving blocks) are kept
+    in a `dynamic` list that every query also checks.
+
+    `x` and `y` are the tile position of the grid's first cell, for the
+    infinite maps whose tiles can lie left of or above the origin.
+    """
+
+    def __init__(self, width=0, height=0, tile_w=16, tile_h=16, x=0, y=0):
+        self.tile_w = tile_w
+        self.tile_h = tile_h
+        self.x = x
+        self.y = y
+        self.sorts = numpy.zeros((height, width), numpy.uint8)
+        self.dynamic = []
+
+        # shape tables indexed by the stored value, scaled to the tile size
+        self.shape_x, self.shape_y, self.shape_w, self.shape_h = shape_tables(
+            tile_w, tile_h
+        )
+        self.shapes = tuple(
+            i.tolist() for i in (self.shape_x, self.shape_y, self.shape_w, self.shape_h)
+        )
+        # flat view sharing memory with `sorts`, for fast scalar lookups
+        self.cells = memoryview(self.sorts.reshape(-1))
+
+    @classmethod
+    def from_layer(
+        cls, data, width, height, firstgids, tile_w=16, tile_h=16, x=0, y=0
+    ):
+        """Build the grid of a Tiled tile layer.
+
+        `firstgids` maps every GID to the firstgid of its tileset; the block
+        sort of a tile is its index within its tileset.
+        """
+        grid = cls(width, height, tile_w, tile_h, x, y)
+        gids = numpy.asarray(data, numpy.int64).reshape(height, width) & GID_MASK
+        firstgids = numpy.asarray(firstgids, numpy.int64)
+        known = (gids > 0) & (gids < len(firstgids))
+
+        sorts = numpy.zeros_like(gids)
+        sorts[known] = gids[known] - firstgids[gids[known]] + 1
+        grid.sorts[...] = numpy.clip(sorts, 0, 255)
+
+        return grid
+
+    def add(self, actor):
+        self.dynamic.append(actor)
+
+    def remove(self, actor):
+        self.dynamic.remove(actor)
+
+    def cell_window(self, rect):
+        """Tile bounds `(left, top, right, bottom)` of `rect`, clipped to the grid."""
+        height, width = self.sorts.shape
+        left = max(rect.left // self.tile_w - self.x, 0)
+        top = max(rect.top // self.tile_h - self.y, 0)
+        # never below left/top, or a rect beyond the grid's top left corner
+        # would give negative ends, which numpy slices count from the end
+        return (
+            left,
+            top,
+            max(min((rect.right - 1) // self.tile_w + 1 - self.x, width), left),
+            max(min((rect.bottom - 1) // self.tile_h + 1 - self.y, height), top),
+        )
+
+    def collide_static(self, rect):
+        left, top, right, bottom = self.cell_window(rect)
+        width = self.sorts.shape[1]
+        cells = self.cells
+        shape_x, shape_y, shape_w, shape_h = self.shapes
+
+        # a probe rect covers a handful of cells, so a plain loop over the
+        # flat byte view beats setting up numpy operations for each query
+        for y in range(top, bottom):
+            row = y * width
+            for x in range(left, right):
+                value = cells[row + x]
+                if not value:
+                    continue
+
+                solid_left = (self.x + x) * self.tile_w + shape_x[value]
+                solid_top = (self.y + y) * self.tile_h + shape_y[value]
+                if (
+                    solid_left < rect.right
+                    and solid_left + shape_w[value] > rect.left
+                    and solid_top < rect.bottom
+                    and solid_top + shape_h[value] > rect.top
+                ):
+                    return True
+
+        return False
+
+    def collide(self, rect):
+        """Check whether `rect` overlaps a solid tile or solid actor."""
+        return self.collide_static(rect) or any(
+            i.solid and i.shape.colliderect(rect) for i in self.dynamic
+        )
+
+    def collide_many(self, left, top, w, h):
+        """`collide` for many rects at once, given as integer arrays of their
+        left, top, width and height; returns a boolean array."""
+        right = left + w
+        bottom = top + h
+        hit = self.collide_many_static(left, top, right, bottom)
+
+        for i in self.dynamic:
+            if i.solid:
+                shape = i.shape
+                hit |= (
+                    (left < shape.right)
+                    & (right > shape.left)
+                    & (top < shape.bottom)
+                    & (bottom > shape.top)
+                )
+
+        return hit
+
+    def collide_many_static(self, left, top, right, bottom):
+        """The static part of `collide_many`, for rects given by their edges."""
+        height, width = self.sorts.shape
+        first_x = numpy.maximum(left // self.tile_w - self.x, 0)
+        first_y = numpy.maximum(top // self.tile_h - self.y, 0)
+        end_x = numpy.minimum((right - 1) // self.tile_w + 1 - self.x, width)
+        end_y = numpy.minimum((bottom - 1) // self.tile_h + 1 - self.y, height)
+
+        hit = numpy.zeros(len(left), bool)
+        if len(left) and width and height:
+            # the cells under every rect at once: axis 0 and 1 are the cell
+            # offsets from the rect's first cell, axis 2 the rects
+            x = first_x + numpy.arange(int((end_x - first_x).max()))[:, None]
+            y = first_y + numpy.arange(int((end_y - first_y).max()))[:, None]
+            x = x[None, :, :]
+            y = y[:, None, :]
+            value = numpy.where(
+                (x < end_x) & (y < end_y),
+                self.sorts[numpy.minimum(y, height - 1), numpy.minimum(x, width - 1)],
+                0,
+            )
+
+            solid_left = (self.x + x) * self.tile_w + self.shape_x[value]
+            solid_top = (self.y + y) * self.tile_h + self.shape_y[value]
+            hit = (
+                (value > 0)
+                & (solid_left < right)
+                & (solid_left + self.shape_w[value] > left)
+                & (solid_top < bottom)
+                & (solid_top + self.shape_h[value] > top)
+            ).any(axis=(0, 1))
+
+        return hit
+
+    def solid_rects(self, rect):
+        """Yield the solid area of every static tile overlapping `rect`."""
+        left, top, right, bottom = self.cell_window(rect)
+
+        for y, x in zip(*numpy.nonzero(self.sorts[top:bottom, left:right])):
+            value = self.sorts[top + y, left + x]
+            yield (
+                (self.x + left + x) * self.tile_w + int(self.shape_x[value]),
+                (self.y + top + y) * self.tile_h + int(self.shape_y[value]),
+                int(self.shape_w[value]),
+                int(self.shape_h[value]),
+            )
+
+
+class ChunkedSolidGrid(SolidGrid):
+    """A `SolidGrid` for streamed maps, kept as one small grid per chunk.
+
+    A chunk's grid is built from the GIDs in `tiles` (a `LayerChunks`) the
+    first time a query reaches it, and at most `max_chunks` of them are
+    kept: the least recently used ones are dropped, to be built again if
+    anything comes back to them. Memory then follows where actors are, not
+    the size of the map.
+    """
+
+    def __init__(self, tiles, firstgids, tile_w=16, tile_h=16, max_chunks=STREAM_CACHE):
+        super().__init__(0, 0, tile_w, tile_h)
+        self.tiles = tiles
+        self.firstgids = firstgids
+        self.chunk_size = tiles.chunk_size
+        self.chunk_w = tile_w * self.chunk_size
+        self.chunk_h = tile_h * self.chunk_size
+        self.max_chunks = max_chunks
+        # built grids, least recently used first (empty ones for chunks
+        # without tiles)
+        self.chunks = OrderedDict()
+
+    def chunk(self, key):
+        grid = self.chunks.get(key)
+        if grid is not None:
+            self.chunks.move_to_end(key)
+            return grid
+
+        tiles = self.tiles.get(key)
+        if tiles is None:
+            grid = SolidGrid(0, 0, self.tile_w, self.tile_h)
+        else:
+            size = self.chunk_size
+            grid = SolidGrid.from_layer(
+                tiles,
+                size,
+                size,
+                self.firstgids,
+                self.tile_w,
+                self.tile_h,
+                key[0] * size,
+                key[1] * size,
+            )
+
+        self.chunks[key] = grid
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return grid
+
+    def chunk_keys(self, rect):
+        for cy in range(rect.top // self.chunk_h, (rect.bottom - 1) // self.chunk_h + 1):
+            for cx in range(rect.left // self.chunk_w, (rect.right - 1) // self.chunk_w + 1):
+                yield cx, cy
+
+    def collide_static(self, rect):
+        return any(self.chunk(key).collide_static(rect) for key in self.chunk_keys(rect))
+
+    def collide_many_static(self, left, top, right, bottom):
+        hit = numpy.zeros(len(left), bool)
+        if not len(left):
+            return hit
+
+        first_x = left // self.chunk_w
+        first_y = top // self.chunk_h
+        last_x = (right - 1) // self.chunk_w
+        last_y = (bottom - 1) // self.chunk_h
+
+        # every chunk under any rect, then the rects under each of them
+        keys = set()
+        for dy in range(int((last_y - first_y).max()) + 1):
+            for dx in range(int((last_x - first_x).max()) + 1):
+                inside = (first_x + dx <= last_x) & (first_y + dy <= last_y)
+                keys.update(
+                    zip((first_x + dx)[inside].tolist(), (first_y + dy)[inside].tolist())
+                )
+
+        for cx, cy in keys:
+            inside = (first_x <= cx) & (cx <= last_x) & (first_y <= cy) & (cy <= last_y)
+            hit[inside] |= self.chunk((cx, cy)).collide_many_static(
+                left[inside], top[inside], right[inside], bottom[inside]
+            )
+
+        return hit
+
+    def solid_rects(self, rect):
+        for key in self.chunk_keys(rect):
+            yield from self.chunk(key).solid_rects(rect)
+
+
+class SpatialHash:
+    """Spatial index of moving actors, bucketed in square cells of
+    `cell_size` px.
+
+    Each actor remembers the range of cells it was filed under, so `update`
+    only has to touch the index when the actor crossed a cell border.
+    """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.bounds = {}
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __contains__(self, actor):
+        return actor in self.bounds
+
+    def cell_bounds(self, rect):
+        size = self.cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size,
+            (rect.bottom - 1) // size,
+        )
+
+    @staticmethod
+    def cell_keys(bounds):
+        left, top, right, bottom = bounds
+        return [
+            (x, y) for y in range(top, bottom + 1) for x in range(left, right + 1)
+        ]
+
+    def add(self, actor):
+        bounds = self.cell_bounds(actor.shape)
+        self.bounds[actor] = bounds
+        for key in self.cell_keys(bounds):
+            self.cells.setdefault(key, set()).add(actor)
+
+    def remove(self, actor):
+        bounds = self.bounds.pop(actor, None)
+        if bounds is None:
+            return
+
+        for key in self.cell_keys(bounds):
+            cell = self.cells[key]
+            cell.discard(actor)
+            if not cell:
+                del self.cells[key]
+
+    def update(self, actor):
+        bounds = self.bounds.get(actor)
+        # actors removed while running (e.g. deactivated) stay out
+        if bounds is not None and bounds != self.cell_bounds(actor.shape):
+            self.remove(actor)
+            self.add(actor)
+
+    def query(self, rect):
+        """Return the set of actors filed under the cells overlapping `rect`."""
+        found = set()
+        for key in self.cell_keys(self.cell_bounds(rect)):
+            cell = self.cells.get(key)
+            if cell:
+                found |= cell
+        return found
+
+
+class ActorList:
+    """Actors stored by id, with O(1) add, lookup and removal.
+
+    Removing an actor moves the last one into its place, so iteration order
+    is not spawn order; anything that needs an order sorts by id.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, actor):
+        return actor.id in self.positions
+
+    def get(self, actor_id):
+        position = self.positions.get(actor_id)
+        return None if position is None else self.items[position]
+
+    def append(self, actor):
+        self.positions[actor.id] = len(self.items)
+        self.items.append(actor)
+
+    def remove(self, actor):
+        position = self.positions.pop(actor.id)
+        last = self.items.pop()
+        if last is not actor:
+            self.items[position] = last
+            self.positions[last.id] = position
+
+
+class ActorIndex:
+    """Culling index for the actors of one layer.
+
+    Actors with `cullable` set are found through a `SpatialHash`; the rest
+    (e.g. tile layers, which cull their own chunks) are always rendered.
+    Actors with `sleeps` set are only run while inside the active area.
+    """
+
+    def __init__(self, cell_size=128):
+        self.hash = SpatialHash(cell_size)
+        self.unculled = ActorList()
+        self.restless = ActorList()
+
+    def add(self, actor):
+        if actor.cullable:
+            self.hash.add(actor)
+        else:
+            self.unculled.append(actor)
+
+        if not actor.sleeps:
+            self.restless.append(actor)
+
+    def remove(self, actor):
+        if actor.cullable:
+            self.hash.remove(actor)
+        else:
+            self.unculled.remove(actor)
+
+        if not actor.sleeps:
+            self.restless.remove(actor)
+
+    def update(self, actor):
+        if actor.cullable:
+            self.hash.update(actor)
+
+    def visible(self, view):
+        """Actors to render inside `view`, by z-index and then spawn order."""
+        return sorted(
+            [*self.unculled, *self.hash.query(view)],
+            key=lambda actor: (actor.z, actor.id),
+        )
+
+    def awake(self, area):
+        """Actors to run this frame: restless ones plus sleepers inside `area`."""
+        return sorted(
+            [
+                *self.restless,
+                *(actor for actor in self.hash.query(area) if actor.sleeps),
+            ],
+            key=lambda actor: actor.id,
+        )
@@ -1,12 +1,65 @@
+import functools
+
 import pygame
 
+from src.assets import assets
+
+
+# Sprites are loaded on first use (or ahead of time with `assets.preload()`)
+assets.register("tux", "res/gfx/Tux/taletuxNL.png")
+assets.register("block", "res/gfx/tiles/block.png")
+assets.register("marbel", "res/gfx/tiles/blue_marbel 2.5d_v1.0.png")
+assets.register("slime", "res/gfx/tiles/slimes sheet.png")
+assets.register("soul", "res/gfx/Soul/soul.png")
+assets.register("bullet", "res/gfx/Soul/bullet.png")
+assets.register("tree", "res/gfx/tiles/big tree.png")
+
+
+def sprite(name) -> pygame.Surface:
+    return assets.get(name)
+
+
+class FrameTable:
+    """The frames of a sprite sheet cut in a grid of `w` x `h` cells.
+
+    The grid starts at `offset` and its cells are `spacing` px apart, as in
+    Tiled tilesets.
+
+    `rects` are `(x, y, w, h)` areas to blit from the sheet, row by row.
+    `surfaces` are the same frames as subsurfaces of the sheet, sliced the
+    first time they are asked for. Tables are shared, so both are tuples.
+    """
+
+    def __init__(self, sheet, w=16, h=16, offset=(0, 0), spacing=0):
+        self.sheet = sheet
+        self.size = (w, h)
+        self.offset = tuple(offset)
+
+        sheet_w, sheet_h = sheet.get_size()
+        x0, y0 = self.offset
+        self.rects = tuple(
+            (x0 + j * (w + spacing), y0 + i * (h + spacing), w, h)
+            for i in range((sheet_h - y0 + spacing) // (h + spacing))
+            for j in range((sheet_w - x0 + spacing) // (w + spacing))
+        )
+        self._surfaces = None
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __getitem__(self, index):
+        return self.rects[index]
+
+    @property
+    def surfaces(self):
+        if self._surfaces is None:
+            self._surfaces = tuple(self.sheet.subsurface(i) for i in self.rects)
+        return self._surfaces
+
 
-sprite_tux = pygame.image.load("res/gfx/Tux/taletuxNL.png").convert_alpha()
-sprite_block = pygame.image.load("res/gfx/tiles/block.png").convert_alpha()
-sprite_marbel = pygame.image.load(
-    "res/gfx/tiles/blue_marbel 2.5d_v1.0.png"
-).convert_alpha()
-sprite_slime = pygame.image.load("res/gfx/tiles/slimes sheet.png").convert_alpha()
-sprite_soul = pygame.image.load("res/gfx/Soul/soul.png").convert_alpha()
-sprite_bullet = pygame.image.load("res/gfx/Soul/bullet.png").convert_alpha()
-sprite_tree = pygame.image.load("res/gfx/tiles/big tree.png").convert_alpha()
+# bounded, so the tables (and through them the sheets) of maps that are no
+# longer loaded don't stay alive for good
+@functools.lru_cache(maxsize=64)
+def frame_table(sheet, w=16, h=16, offset=(0, 0), spacing=0):
+    """The shared `FrameTable` of a sheet, built on first use."""
+    return FrameTable(sheet, w, h, offset, spacing)
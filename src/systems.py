@@ -0,0 +1,110 @@
+import time
+
+import numpy
+
+from src.game import game
+from src.profiler import profiler
+
+
+def rect_coord(values):
+    """What pygame.Rect makes of float coordinates passed to its constructor."""
+    return numpy.trunc(values).astype(numpy.int64)
+
+
+def rect_assign(values):
+    """What pygame.Rect makes of float coordinates assigned to its attributes:
+    rounded half away from zero."""
+    whole = numpy.trunc(values)
+    return (whole + (numpy.abs(values - whole) >= 0.5) * numpy.sign(values)).astype(
+        numpy.int64
+    )
+
+
+class SlimeSystem:
+    """Runs every awake slime in one vectorized step.
+
+    The slimes' positions are gathered into arrays, the chase vectors, the
+    moves against `game.solid_grid` and the animation frames of the whole
+    population are computed with numpy, and the results are written back.
+    The outcome is the same as calling `Slime.run` on each of them, down to
+    the rounding pygame.Rect does.
+    """
+
+    SPEED = 0.5
+    # below this many slimes the fixed cost of the numpy calls outweighs
+    # running them one by one
+    MIN_BATCH = 32
+
+    def run(self, slimes):
+        count = len(slimes)
+        if count < self.MIN_BATCH:
+            for slime in slimes:
+                slime.run()
+            return
+
+        player = game.game_player.shape
+
+        x = numpy.fromiter((i.x for i in slimes), float, count)
+        y = numpy.fromiter((i.y for i in slimes), float, count)
+        shape_x = numpy.fromiter((i.shape.x for i in slimes), numpy.int64, count)
+        shape_y = numpy.fromiter((i.shape.y for i in slimes), numpy.int64, count)
+        w = numpy.fromiter((i.shape.w for i in slimes), numpy.int64, count)
+        h = numpy.fromiter((i.shape.h for i in slimes), numpy.int64, count)
+
+        # chase Tux at SPEED px per tick
+        chase_x = (player.x - shape_x).astype(float)
+        chase_y = (player.y - shape_y).astype(float)
+        length = numpy.sqrt(chase_x * chase_x + chase_y * chase_y)
+        moving = length > 0
+        length[~moving] = 1
+        xspeed = numpy.where(moving, chase_x / length * self.SPEED, 0.0)
+        yspeed = numpy.where(moving, chase_y / length * self.SPEED, 0.0)
+
+        timed = profiler.enabled
+        start = time.perf_counter() if timed else 0
+
+        # move along x, then along y, each only if the way is free
+        blocked = game.solid_grid.collide_many(
+            rect_coord(shape_x + xspeed), shape_y, w, h
+        )
+        xspeed[blocked] = 0
+        x = numpy.where(blocked, x, x + xspeed)
+        shape_x = numpy.where(blocked, shape_x, rect_assign(x))
+        shape_y = numpy.where(blocked, shape_y, rect_assign(y))
+
+        blocked = game.solid_grid.collide_many(
+            shape_x, rect_coord(shape_y + yspeed), w, h
+        )
+        yspeed[blocked] = 0
+        y = numpy.where(blocked, y, y + yspeed)
+        shape_x = numpy.where(blocked, shape_x, rect_assign(x))
+        shape_y = numpy.where(blocked, shape_y, rect_assign(y))
+
+        if timed:
+            profiler.add("collision", time.perf_counter() - start)
+
+        frame_index = numpy.fromiter((i.frame_index for i in slimes), float, count)
+        frame_index += 0.1
+
+        for slime, *state in zip(
+            slimes,
+            x.tolist(),
+            y.tolist(),
+            xspeed.tolist(),
+            yspeed.tolist(),
+            shape_x.tolist(),
+            shape_y.tolist(),
+            frame_index.tolist(),
+        ):
+            (
+                slime.x,
+                slime.y,
+                slime.xspeed,
+                slime.yspeed,
+                slime.shape.x,
+                slime.shape.y,
+                slime.frame_index,
+            ) = state
+
+
+slime_system = SlimeSystem()
@@ -0,0 +1,250 @@
+"""Text drawn from cached glyphs.
+
+`glyphs(font, color)` returns the `GlyphCache` of a font in a color: each
+character is rendered the first time it is drawn and kept, and a string is
+drawn as a single `blits` call over its glyphs. Text that changes every
+frame (timers, counters, typewriter effects) then costs no font rendering
+at all once its characters have been seen.
+
+`layout_text` wraps text into lines by measured word widths, and caches
+the result.
+
+`font` can be a `pygame.font.Font` or one of the `BitmapFont`s drawn from
+the sheets in res/gfx/engine, see `bitmap_font`.
+"""
+import functools
+import re
+
+import pygame
+
+from src.assets import assets
+
+
+# name -> (sheet, glyph width, glyph height, first character, columns)
+BITMAP_FONTS = {
+    "small": ("res/gfx/engine/font.png", 6, 8, 0, 32),
+    "large": ("res/gfx/engine/font-large.png", 12, 14, 33, 8),
+}
+
+
+class BitmapFont:
+    """A fixed width font cut from a sheet of glyphs laid out in character
+    order, starting at `first`. It has the `pygame.font.Font` methods the
+    text code uses, so either kind of font can be passed around."""
+
+    def __init__(self, path, glyph_w, glyph_h, first=32, columns=16, fallback="?"):
+        self.sheet = assets.get(path)
+        self.glyph_w = glyph_w
+        self.glyph_h = glyph_h
+        self.first = first
+        self.columns = columns
+        self.count = columns * (self.sheet.get_height() // glyph_h)
+        self.fallback = fallback
+
+    def area(self, char):
+        """The area of `char` on the sheet, or None for a blank."""
+        if char.isspace():
+            return None
+
+        index = ord(char) - self.first
+        if not 0 <= index < self.count:
+            if char == self.fallback:
+                return None
+            return self.area(self.fallback)
+
+        return pygame.Rect(
+            index % self.columns * self.glyph_w,
+            index // self.columns * self.glyph_h,
+            self.glyph_w,
+            self.glyph_h,
+        )
+
+    def size(self, text):
+        return len(text) * self.glyph_w, self.glyph_h
+
+    def get_linesize(self):
+        return self.glyph_h
+
+    def get_height(self):
+        return self.glyph_h
+
+    def render(self, text, antialias=False, color=None, background=None):
+        """Draw `text` on a new surface, tinted by `color` (the sheets are white)."""
+        surface = pygame.Surface(self.size(text), pygame.SRCALPHA)
+        if background is not None:
+            surface.fill(background)
+
+        glyph = pygame.Surface((self.glyph_w, self.glyph_h), pygame.SRCALPHA)
+        for i, char in enumerate(text):
+            area = self.area(char)
+            if area is None:
+                continue
+
+            glyph.fill((0, 0, 0, 0))
+            glyph.blit(self.sheet, (0, 0), area)
+            if color is not None:
+                glyph.fill(color, special_flags=pygame.BLEND_RGBA_MULT)
+            surface.blit(glyph, (i * self.glyph_w, 0))
+
+        return surface
+
+
+@functools.lru_cache
+def bitmap_font(name="small"):
+    return BitmapFont(*BITMAP_FONTS[name])
+
+
+class GlyphCache:
+    """The glyphs of one font in one color, each rendered once."""
+
+    def __init__(self, font, color, antialias=True):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.glyphs = {}
+
+    def glyph(self, char):
+        """`(surface, advance)` of a character."""
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            surface = self.font.render(char, self.antialias, self.color)
+            glyph = self.glyphs[char] = (surface, surface.get_width())
+        return glyph
+
+    def width(self, text):
+        glyph = self.glyph
+        return sum(glyph(char)[1] for char in text)
+
+    def blit_list(self, text, x, y):
+        """The `(surface, dest)` pairs that draw `text` at `(x, y)`."""
+        blits = []
+        glyph = self.glyph
+        for char in text:
+            surface, advance = glyph(char)
+            blits.append((surface, (x, y)))
+            x += advance
+        return blits
+
+    def draw(self, surface, text, x, y):
+        surface.blits(self.blit_list(text, x, y), doreturn=False)
+
+
+@functools.lru_cache(64)
+def cached_glyphs(font, color, antialias=True):
+    return GlyphCache(font, color, antialias)
+
+
+def glyphs(font, color, antialias=True):
+    """The `GlyphCache` of `font` in `color`, which can be anything
+    `pygame.Color` takes (a `pygame.Color`, a list, a name...)."""
+    return cached_glyphs(font, tuple(pygame.Color(color)), antialias)
+
+
+class TextLayoutError(ValueError):
+    """Text that doesn't fit the space it is laid out in."""
+
+
+class Layout:
+    """Text wrapped into lines.
+
+    `spans` holds the `(start, end)` offsets of every line in the source
+    text and `widths` their widths in px; `lines` are the lines themselves,
+    with runs of whitespace inside them collapsed to single spaces.
+    """
+
+    def __init__(self, lines, spans, widths, line_height):
+        self.lines = lines
+        self.spans = spans
+        self.widths = widths
+        self.line_height = line_height
+
+    @property
+    def height(self):
+        return len(self.lines) * self.line_height
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+
+@functools.lru_cache(4096)
+def word_width(font, word):
+    return font.size(word)[0]
+
+
+@functools.lru_cache(256)
+def measure_words(text, font):
+    """The words of every paragraph (line of `text`) with their widths.
+
+    Returns a list of `(offset, words)` per paragraph, where `words` are
+    `(start, end, width)`. None of this depends on the wrap width, so
+    wrapping the same text to another width measures nothing again.
+    """
+    paragraphs = []
+    offset = 0
+    for paragraph in text.split("\n"):
+        words = []
+        for match in re.finditer(r"\S+", paragraph):
+            words.append(
+                (offset + match.start(), offset + match.end(), word_width(font, match[0]))
+            )
+        paragraphs.append((offset, words))
+        offset += len(paragraph) + 1
+    return paragraphs
+
+
+@functools.lru_cache(1024)
+def layout_text(text, font, max_width, max_height=0):
+    """Wrap `text` into lines no wider than `max_width` px.
+
+    Lines break between words and at newlines. Raises `TextLayoutError` if
+    a word is wider than `max_width`, or if `max_height` is given and the
+    lines are taller than that.
+    """
+    space = word_width(font, " ")
+    spans = []
+    widths = []
+
+    for offset, words in measure_words(text, font):
+        if not words:
+            spans.append((offset, offset))
+            widths.append(0)
+            continue
+
+        start, end, width = words[0]
+        for word_start, word_end, word in words:
+            if word > max_width:
+                raise TextLayoutError(
+                    f'the word "{text[word_start:word_end]}" is too long to fit in '
+                    f"a width of {max_width}px, out of bounds by {word - max_width}px"
+                )
+
+            if word_start == start:
+                continue
+
+            if width + space + word > max_width:
+                spans.append((start, end))
+                widths.append(width)
+                start, end, width = word_start, word_end, word
+            else:
+                end = word_end
+                width += space + word
+
+        spans.append((start, end))
+        widths.append(width)
+
+    layout = Layout(
+        [" ".join(text[start:end].split()) for start, end in spans],
+        spans,
+        widths,
+        font.get_height(),
+    )
+    if max_height > 0 and layout.height > max_height:
+        raise TextLayoutError(
+            f"the lines {layout.lines} are too long in the y axis by "
+            f"{layout.height - max_height}px"
+        )
+
+    return layout
@@ -0,0 +1,363 @@
+from collections import OrderedDict
+
+import numpy
+import pygame
+
+from src.assets import assets
+from src.sprites import frame_table
+
+
+# Tiled stores flip/rotation flags in the top bits of every GID
+GID_MASK = 0x1FFFFFFF
+
+# Size of a baked chunk, in tiles. 16x16 tiles of 16px gives 256x256 surfaces,
+# so a 400x240 view never touches more than 3x2 chunks per layer.
+CHUNK_SIZE = 16
+
+# Streamed layers keep the chunks this many chunks around the view baked,
+# and at most STREAM_CACHE chunks in total.
+STREAM_RADIUS = 1
+STREAM_CACHE = 48
+
+
+def chunk_keys(x, y, width, height, chunk_size=CHUNK_SIZE):
+    """Keys of the chunks a block of `width` x `height` tiles at tile
+    position `(x, y)` overlaps."""
+    for cy in range(y // chunk_size, (y + height - 1) // chunk_size + 1):
+        for cx in range(x // chunk_size, (x + width - 1) // chunk_size + 1):
+            yield cx, cy
+
+
+def chunk_part(grid, x, y, key, chunk_size=CHUNK_SIZE):
+    """The part of the block `grid` (at tile position `(x, y)`) inside chunk
+    `key`, and where it goes in the chunk."""
+    height, width = grid.shape
+    cx, cy = key
+    # the part of the block inside this chunk, relative to the block
+    left = max(cx * chunk_size - x, 0)
+    top = max(cy * chunk_size - y, 0)
+    right = min((cx + 1) * chunk_size - x, width)
+    bottom = min((cy + 1) * chunk_size - y, height)
+
+    return grid[top:bottom, left:right], x + left - cx * chunk_size, y + top - cy * chunk_size
+
+
+def split_chunks(data, width, height, chunk_size=CHUNK_SIZE, x=0, y=0, chunks=None):
+    """Split a row-major block of GIDs into `chunk_size` square chunks.
+
+    `x` and `y` are the tile position of the block, which may be negative in
+    infinite maps. Parts of the block are merged into the chunks already in
+    `chunks`; chunks with no tiles at all are left out.
+    """
+    chunks = {} if chunks is None else chunks
+    grid = numpy.asarray(data, numpy.uint32).reshape(height, width)
+
+    for key in chunk_keys(x, y, width, height, chunk_size):
+        block, chunk_x, chunk_y = chunk_part(grid, x, y, key, chunk_size)
+        if not block.any():
+            continue
+
+        chunk = chunks.get(key)
+        if chunk is None:
+            chunk = numpy.zeros((chunk_size, chunk_size), numpy.uint32)
+            chunks[key] = chunk
+
+        chunk[chunk_y : chunk_y + block.shape[0], chunk_x : chunk_x + block.shape[1]] = block
+
+    return chunks
+
+
+def layer_chunks(layer, chunk_size=CHUNK_SIZE):
+    """The GIDs of a Tiled tile layer, finite or infinite, split into chunks."""
+    if "chunks" not in layer:
+        return split_chunks(layer["data"], layer["width"], layer["height"], chunk_size)
+
+    chunks = {}
+    for i in layer["chunks"]:
+        split_chunks(i["data"], i["width"], i["height"], chunk_size, i["x"], i["y"], chunks)
+    return chunks
+
+
+class LayerChunks:
+    """The GIDs of a Tiled tile layer, finite or infinite, cut into chunks
+    only as they are asked for.
+
+    This is what streamed layers read from: `get` copies out one chunk, so
+    the parts of a map that are never visited are never split (nor, with a
+    memory-mapped map, read from the file at all).
+    """
+
+    def __init__(self, layer, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        if "chunks" not in layer:
+            # one block; its chunks are found by arithmetic, since a large
+            # map has far too many of them to index
+            self.grid = numpy.asarray(layer["data"]).reshape(layer["height"], layer["width"])
+            self.index = None
+            return
+
+        # chunk key -> the Tiled chunks it overlaps
+        self.grid = None
+        self.index = {}
+        for i in layer["chunks"]:
+            if (
+                i["width"] == i["height"] == chunk_size
+                and not i["x"] % chunk_size
+                and not i["y"] % chunk_size
+            ):
+                # Tiled's own chunks are 16x16 by default, so usually line up
+                self.index[(i["x"] // chunk_size, i["y"] // chunk_size)] = [i]
+                continue
+            for key in chunk_keys(i["x"], i["y"], i["width"], i["height"], chunk_size):
+                self.index.setdefault(key, []).append(i)
+
+    def blocks(self, key):
+        """The `(grid, x, y)` of every block of GIDs overlapping chunk `key`."""
+        if self.index is not None:
+            return [
+                (numpy.asarray(i["data"]).reshape(i["height"], i["width"]), i["x"], i["y"])
+                for i in self.index.get(key, ())
+            ]
+
+        height, width = self.grid.shape
+        cx, cy = key
+        size = self.chunk_size
+        if 0 <= cx * size < width and 0 <= cy * size < height:
+            return [(self.grid, 0, 0)]
+        return []
+
+    def __contains__(self, key):
+        if self.index is not None:
+            return key in self.index
+        return bool(self.blocks(key))
+
+    def get(self, key, default=None):
+        """The GIDs of chunk `key`, or `default` if it has no tiles."""
+        chunk = None
+        for grid, x, y in self.blocks(key):
+            block, chunk_x, chunk_y = chunk_part(grid, x, y, key, self.chunk_size)
+            if not block.any():
+                continue
+
+            if chunk is None:
+                chunk = numpy.zeros((self.chunk_size, self.chunk_size), numpy.uint32)
+            chunk[chunk_y : chunk_y + block.shape[0], chunk_x : chunk_x + block.shape[1]] = block
+
+        return default if chunk is None else chunk
+
+
+def chunk_range(cam_x, cam_y, view_w, view_h, chunk_w, chunk_h, radius=0):
+    """Keys of the chunks of `chunk_w` x `chunk_h` px inside the view, grown
+    by `radius` chunks."""
+    first_x = int(cam_x // chunk_w) - radius
+    first_y = int(cam_y // chunk_h) - radius
+    last_x = int((cam_x + view_w) // chunk_w) + radius
+    last_y = int((cam_y + view_h) // chunk_h) + radius
+
+    for cy in range(first_y, last_y + 1):
+        for cx in range(first_x, last_x + 1):
+            yield cx, cy
+
+
+def layer_grid(layer):
+    """The GIDs of a Tiled tile layer as a 2D array, with the tile position
+    of its top left corner (not 0, 0 for infinite maps)."""
+    if "chunks" not in layer:
+        grid = numpy.asarray(layer["data"], numpy.uint32)
+        return grid.reshape(layer["height"], layer["width"]), 0, 0
+
+    x, y = layer["startx"], layer["starty"]
+    grid = numpy.zeros((layer["height"], layer["width"]), numpy.uint32)
+    for i in layer["chunks"]:
+        grid[
+            i["y"] - y : i["y"] - y + i["height"], i["x"] - x : i["x"] - x + i["width"]
+        ] = numpy.asarray(i["data"], numpy.uint32).reshape(i["height"], i["width"])
+    return grid, x, y
+
+
+class ChunkedLayer:
+    """A tile layer pre-rendered into fixed size chunk surfaces.
+
+    Tiles are blitted once into their chunk when it is baked, so drawing the
+    layer costs one blit per chunk on screen instead of one per tile.
+    Chunks with no tiles are never created.
+
+    `load` takes the layer's GIDs and `bake` renders every chunk up front. A
+    layer with `max_chunks` set is streamed instead: given a `LayerChunks`,
+    `stream` cuts out and bakes the chunks around the camera as it moves and
+    drops the least recently used ones beyond `max_chunks`, so memory
+    doesn't grow with the size of the map.
+    """
+
+    def __init__(
+        self,
+        width,
+        height,
+        tile_w=16,
+        tile_h=16,
+        chunk_size=CHUNK_SIZE,
+        max_chunks=None,
+    ):
+        self.width = width
+        self.height = height
+        self.tile_w = tile_w
+        self.tile_h = tile_h
+        self.chunk_size = chunk_size
+        self.chunk_w = tile_w * chunk_size
+        self.chunk_h = tile_h * chunk_size
+        self.max_chunks = max_chunks
+        # baked surfaces, least recently used first
+        self.chunks = OrderedDict()
+        self.tiles = {}
+        self.lookup = None
+
+    @property
+    def streaming(self):
+        return self.max_chunks is not None
+
+    def load(self, tiles, lookup):
+        """Use the GIDs in `tiles` (chunk key -> 2D array, see `split_chunks`,
+        or a `LayerChunks`) and the `lookup` that maps a GID to the
+        `(surface, area)` to draw for it. Nothing is baked yet."""
+        self.tiles = tiles
+        self.lookup = lookup
+        self.chunks = OrderedDict()
+
+    def bake(self):
+        """Render every chunk that isn't baked yet."""
+        for key in self.tiles:
+            if key not in self.chunks:
+                self.bake_chunk(key)
+
+    def bake_chunk(self, key):
+        tiles = self.tiles.get(key)
+        if tiles is None:
+            # a streamed chunk that turned out empty; remembered so it isn't
+            # cut out again every frame
+            self.chunks[key] = None
+            return None
+
+        chunk = pygame.Surface((self.chunk_w, self.chunk_h), pygame.SRCALPHA).convert_alpha()
+        blits = []
+        # looping over numpy scalars is several times slower than over ints
+        for y, row in enumerate(tiles.tolist()):
+            for x, tile_gid in enumerate(row):
+                if tile_gid <= 0:
+                    continue
+
+                image, area = self.lookup(tile_gid)
+                if image is not None:
+                    blits.append((image, (x * self.tile_w, y * self.tile_h), area))
+
+        chunk.blits(blits, doreturn=False)
+        self.chunks[key] = chunk
+        return chunk
+
+    def chunk_range(self, cam_x, cam_y, view_w, view_h, radius=0):
+        """Keys of the chunks inside the view, grown by `radius` chunks."""
+        return chunk_range(cam_x, cam_y, view_w, view_h, self.chunk_w, self.chunk_h, radius)
+
+    def get_chunk(self, key):
+        """The baked surface of a chunk (baking it if needed), or None if empty."""
+        if key in self.chunks:
+            if self.streaming:
+                self.chunks.move_to_end(key)
+            return self.chunks[key]
+
+        if key in self.tiles:
+            return self.bake_chunk(key)
+        return None
+
+    def stream(self, cam_x, cam_y, view_w, view_h, radius=STREAM_RADIUS):
+        """Bake the chunks within `radius` chunks of the view and evict the
+        least recently used ones beyond `max_chunks`."""
+        near = 0
+        for key in self.chunk_range(cam_x, cam_y, view_w, view_h, radius):
+            self.get_chunk(key)
+            near += 1
+
+        # the chunks just used are the most recent ones, so only ever evict
+        # chunks outside the radius
+        while len(self.chunks) > max(self.max_chunks, near):
+            self.chunks.popitem(last=False)
+
+    def visible_chunks(self, cam_x, cam_y, view_w, view_h):
+        """Yield `(key, surface)` for every chunk inside the view."""
+        for key in self.chunk_range(cam_x, cam_y, view_w, view_h):
+            chunk = self.get_chunk(key)
+            if chunk is not None:
+                yield key, chunk
+
+    def blit_list(self, cam_x, cam_y, view_w, view_h):
+        """The `(surface, dest)` pairs that draw the chunks inside the view."""
+        return [
+            (chunk, (cx * self.chunk_w - cam_x, cy * self.chunk_h - cam_y))
+            for (cx, cy), chunk in self.visible_chunks(cam_x, cam_y, view_w, view_h)
+        ]
+
+    def draw(self, surface, cam_x, cam_y):
+        view_w, view_h = surface.get_size()
+        surface.blits(self.blit_list(cam_x, cam_y, view_w, view_h), doreturn=False)
+
+
+class TilesetRegistry:
+    """Every tile of a map's tilesets, indexed by GID.
+
+    Each tileset image with any tiles in it is loaded once through the
+    asset manager, and the area of every tile in it is computed up front,
+    so resolving a GID is a single list lookup.
+    """
+
+    def __init__(self, tilesets, base_path="res"):
+        self.tilesets = tilesets
+        self.images = []
+
+        last_gid = max(
+            (i["firstgid"] + i["tilecount"] for i in tilesets), default=1
+        )
+        self.tiles = [(None, None)] * last_gid
+        self.firstgids = [0] * last_gid
+
+        for tileset in tilesets:
+            if "image" not in tileset or not tileset["tilecount"]:
+                # external (.tsx) tilesets are not supported yet, and empty
+                # ones may name an image that doesn't exist
+                self.images.append(None)
+                continue
+
+            image = assets.get(tileset["image"].replace("..", base_path))
+            self.images.append(image)
+
+            margin = tileset.get("margin", 0)
+            frames = frame_table(
+                image,
+                tileset["tilewidth"],
+                tileset["tileheight"],
+                (margin, margin),
+                tileset.get("spacing", 0),
+            )
+
+            if tileset["tilecount"] > len(frames):
+                raise ValueError(
+                    f"tileset {tileset.get('name')!r} has {tileset['tilecount']} "
+                    f"tiles, but its image only fits {len(frames)}"
+                )
+
+            for index, rect in enumerate(frames.rects[: tileset["tilecount"]]):
+                gid = tileset["firstgid"] + index
+                self.firstgids[gid] = tileset["firstgid"]
+                self.tiles[gid] = (image, pygame.Rect(rect))
+
+    def get(self, tile_gid):
+        """Return the `(surface, area)` of a GID, or `(None, None)`."""
+        tile_gid &= GID_MASK
+        if 0 < tile_gid < len(self.tiles):
+            return self.tiles[tile_gid]
+        return None, None
+
+    def get_tileset(self, tile_gid):
+        """Return the tileset image a GID belongs to and the tileset's firstgid."""
+        tile_gid &= GID_MASK
+        if 0 < tile_gid < len(self.tiles) and self.firstgids[tile_gid]:
+            return [self.tiles[tile_gid][0], self.firstgids[tile_gid]]
+        return [None, 0]
@@ -2,10 +2,11 @@ from typing import *
 import pygame
 import json
 import math
-import sys
 import functools
 
 import src.globals
+from src.lang import lang, tr
+from src.text import glyphs, layout_text
 
 
 # colors have also alpha
@@ -90,10 +91,7 @@ def is_right_click(event: pygame.event.Event) -> bool:
 
 @functools.lru_cache
 def get_font(size, font=None) -> pygame.font.Font:
-    if font is None:
-        return src.globals.font
-    else:
-        return pygame.font.Font(font, size)
+    return pygame.font.Font(src.globals.DEFAULT_FONT if font is None else font, size)
 
 
 def wrap_multi_lines(
@@ -103,35 +101,8 @@ def wrap_multi_lines(
     max_height: int = 0,
     antialias: bool = True,
 ) -> List:
-    finished_lines = [""]
-
-    for word in text.split(" "):
-        w = font.render(word, antialias, BLACK).get_width()
-        # check if one word is too long to fit in one line
-        if w > max_width:
-            sys.exit(
-                f"""the word: "{word}" is too long to fit in a width of: {max_width}, out of bounds by: {w - max_width}pxls"""
-            )
-
-        if (
-            font.render(finished_lines[-1] + word, antialias, BLACK).get_width()
-            > max_width
-        ):
-            finished_lines.append(f"""{word}""")
-        else:
-            finished_lines[-1] += f""" {word}"""
-    finished_lines[0] = finished_lines[0][1:]
-    if max_height > 0:
-        h = 0
-        for line in finished_lines:
-            h += font.render(line, antialias, BLACK).get_height()
-
-        if h > max_height:
-            sys.exit(
-                f"""the lines: {finished_lines} are too long in the y axis by: {h - max_height}pxls"""
-            )
-
-    return finished_lines
+    """Wrap `text` into lines no wider than `max_width`; see `layout_text`."""
+    return list(layout_text(text, font, max_width, max_height).lines)
 
 
 def blit_multiple_lines(
@@ -145,20 +116,18 @@ def blit_multiple_lines(
     color: Tuple[int, int, int] = (0, 0, 0),
 ) -> None:
     if centered_x and not centered_x_pos:
-        sys.exit("Missing 'centered_x_pos'")
+        raise ValueError("Missing 'centered_x_pos'")
     height = font.get_height()
+    cache = glyphs(font, color)
+    blits = []
     for i, text in enumerate(lines):
-        rendered_text_surface = font.render(text, True, color)
         if centered_x:
-            display.blit(
-                rendered_text_surface,
-                (
-                    centered_x_pos - rendered_text_surface.get_width() / 2,
-                    y + (i * height),
-                ),
-            )
+            line_x = centered_x_pos - cache.width(text) / 2
         else:
-            display.blit(rendered_text_surface, (x, y + (i * height)))
+            line_x = x
+        blits.extend(cache.blit_list(text, line_x, y + (i * height)))
+
+    display.blits(blits, doreturn=False)
 
 
 def pixel_perfect_collision(
@@ -195,8 +164,16 @@ def text(txt, color, size=20, font_name=None):
     return get_font(size, font_name).render(str(txt), True, color)
 
 
+@lang.register_cache
+@functools.lru_cache(500)
+def tr_text(key, color, size=20, font_name=None):
+    """`text` of the string `key` in the current language."""
+    return text(tr(key), color, size, font_name)
+
+
 def draw_text(font: pygame.font.Font, x, y, text, color):
-    src.globals.display.blit(font.render(text, True, color), (x, y))
+    """Draw `text` from cached glyphs; `font` may also be a bitmap font."""
+    glyphs(font, color).draw(src.globals.display, text, x, y)
 
 
 def blit_centered(screen, surface, rect):
@@ -272,8 +249,34 @@ def number_format(n: int, l: int) -> str:
     return ns
 
 
-# dumb stuff to replace when I have time:
+class SpriteBatch:
+    """Blits queued during a frame, issued together by one `Surface.blits` call."""
+
+    def __init__(self):
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, spr, dest, area=None):
+        self.items.append((spr, dest, area))
+
+    def extend(self, items):
+        self.items.extend(items)
+
+    def flush(self, target: pygame.Surface):
+        if self.items:
+            target.blits(self.items, doreturn=False)
+            self.items = []
+
+
+sprite_batch = SpriteBatch()
 
 
 def draw_sprite(spr, frame, x, y):
-    src.globals.display.blit(spr, (x, y), frame)
+    """Queue a blit on the display; it happens on the next `flush_sprites`."""
+    sprite_batch.items.append((spr, (x, y), frame))
+
+
+def flush_sprites():
+    sprite_batch.flush(src.globals.display)
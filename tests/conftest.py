@@ -0,0 +1,9 @@
+import os
+import sys
+
+# before anything imports pygame: no window, and the resource paths are
+# relative to the repository root
+os.environ.setdefault("DIM_TROUBLE_HEADLESS", "1")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
@@ -0,0 +1,22 @@
+import bench
+from src.game import game, game_map
+
+
+def test_profiled_pass_repeats_the_timed_one(monkeypatch):
+    simulate = bench.simulate
+    states = []
+
+    def recorded(*args):
+        simulate(*args)
+        pools = sum(len(i) for i in game.unused_actors.values())
+        player = game.game_player
+        states.append(
+            (game_map.actlast, len(game.actor["actorlayer"]), pools, player.x, player.y)
+        )
+
+    monkeypatch.setattr(bench, "simulate", recorded)
+    result = bench.run("res/map/test_for_PGE.json", slimes=20, ticks=60, render=False, bullets=2)
+
+    assert len(states) == 2
+    assert states[0] == states[1]
+    assert result["live_actors"] == states[0][1]
@@ -0,0 +1,119 @@
+import itertools
+import random
+
+import pygame
+import pytest
+
+from src import collisions
+from src.collisions import ENEMY, PLAYER, PROJECTILE, SOLID, find_contacts
+
+
+class Body:
+    def __init__(self, index, rect, tags):
+        self.index = index
+        self.shape = pygame.Rect(rect)
+        self.tags = tags
+        self.alive = True
+
+    def __repr__(self):
+        return f"Body({self.index}, {tuple(self.shape)}, {self.tags})"
+
+
+def record(name):
+    def handler(a, b):
+        pass
+
+    handler.__name__ = name
+    return handler
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    handlers = [
+        (PLAYER, ENEMY, record("player_enemy")),
+        (PROJECTILE, ENEMY | SOLID, record("projectile_hits")),
+        # within one kind of actor
+        (ENEMY, ENEMY, record("enemy_enemy")),
+    ]
+    monkeypatch.setattr(collisions, "contact_handlers", handlers)
+    monkeypatch.setattr(collisions, "interests", {})
+    return handlers
+
+
+def bodies(count, seed, spread=200):
+    rng = random.Random(seed)
+    tags = [PLAYER, ENEMY, SOLID, PROJECTILE, PLAYER | ENEMY, 0]
+    return [
+        Body(
+            i,
+            (
+                rng.randrange(spread),
+                rng.randrange(spread),
+                rng.randrange(1, 40),
+                rng.randrange(1, 40),
+            ),
+            rng.choice(tags),
+        )
+        for i in range(count)
+    ]
+
+
+def contact(handler, a, b):
+    """A contact as `(handler name, index of a, index of b)`. When either
+    actor could be `a` (both carry both tags) the order is arbitrary, so it
+    is normalized."""
+    tags_a, tags_b = next(
+        (i, j) for i, j, h in collisions.contact_handlers if h is handler
+    )
+    if a.tags & tags_b and b.tags & tags_a and b.index < a.index:
+        a, b = b, a
+    return handler.__name__, a.index, b.index
+
+
+def brute_force(actors, handlers):
+    """Every contact, by testing every pair once."""
+    contacts = []
+    for tags_a, tags_b, handler in handlers:
+        for a, b in itertools.combinations(actors, 2):
+            if not a.shape.colliderect(b.shape):
+                continue
+            if a.tags & tags_a and b.tags & tags_b:
+                contacts.append(contact(handler, a, b))
+            elif b.tags & tags_a and a.tags & tags_b:
+                contacts.append(contact(handler, b, a))
+    return sorted(contacts)
+
+
+def swept(actors):
+    return sorted(contact(h, a, b) for h, a, b in find_contacts(actors))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_finds_the_same_contacts_as_every_pair(handlers, seed):
+    actors = bodies(150, seed)
+    assert swept(actors) == brute_force(actors, handlers)
+
+
+def test_touching_edges_are_not_contacts(handlers):
+    player = Body(0, (0, 0, 16, 16), PLAYER)
+    enemy = Body(1, (16, 0, 16, 16), ENEMY)
+    assert swept([player, enemy]) == []
+
+    enemy.shape.x = 15
+    assert swept([player, enemy]) == [("player_enemy", 0, 1)]
+
+
+def test_actors_with_both_tags(handlers):
+    # both are players and enemies: one contact, and none with themselves
+    a = Body(0, (0, 0, 16, 16), PLAYER | ENEMY)
+    b = Body(1, (8, 8, 16, 16), PLAYER | ENEMY)
+    contacts = swept([a, b])
+    assert contacts.count(("player_enemy", 0, 1)) == 1
+    assert ("player_enemy", 0, 0) not in contacts
+    assert contacts == brute_force([a, b], handlers)
+
+
+def test_clustered_actors(handlers):
+    # everything on the same spot: every pair is a candidate
+    actors = [Body(i, (5, 5, 10, 10), ENEMY if i % 3 else PLAYER) for i in range(60)]
+    assert swept(actors) == brute_force(actors, handlers)
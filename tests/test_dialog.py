@@ -0,0 +1,42 @@
+import threading
+
+import pygame
+
+from src.dialog import Dialog, PageRenderer, load_dialogs
+
+
+def test_draw_never_waits_for_a_page():
+    renderer = PageRenderer()
+    render = renderer.render
+    release = threading.Event()
+
+    def slow_render(node):
+        release.wait(5)
+        return render(node)
+
+    renderer.render = slow_render
+    nodes = load_dialogs()
+    dialog = Dialog("0", nodes, renderer)
+    surface = pygame.Surface((400, 240))
+
+    # the page is still rendering: an empty box, drawn without waiting
+    assert renderer.page(dialog.node) is None
+    dialog.draw(surface)
+    assert dialog.shown is None
+    assert surface.get_at((200, 230)) != (0, 0, 0)
+
+    release.set()
+    renderer.pending[dialog.node.id].result()
+    dialog.draw(surface)
+    first = dialog.shown
+    assert first is renderer.page(dialog.node)
+
+    # the previous page stays up until the next one arrives
+    release.clear()
+    renderer.cache_clear()
+    dialog.open(dialog.node.next or dialog.node.responses[0].next)
+    dialog.draw(surface)
+    assert dialog.shown is first
+
+    release.set()
+    renderer.executor.shutdown(wait=True)
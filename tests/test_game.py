@@ -0,0 +1,91 @@
+import pygame
+import pytest
+
+from src import collisions
+from src.actors import Bullet, HorizontallyMovingBlock, Tux
+from src.collisions import PROJECTILE
+from src.game import (
+    activate,
+    deactivate,
+    destroy,
+    game,
+    game_update,
+    prewarm,
+    remove_destroyed,
+    spawn,
+)
+from src.spatial import ActorIndex, ActorList, SolidGrid
+
+
+@pytest.fixture
+def layer(monkeypatch):
+    monkeypatch.setattr(game, "actor", {"test": ActorList()})
+    monkeypatch.setattr(game, "actor_index", {"test": ActorIndex()})
+    monkeypatch.setattr(game, "actor_layer", {})
+    monkeypatch.setattr(game, "unused_actors", {})
+    monkeypatch.setattr(game, "destroyed", [])
+    monkeypatch.setattr(game, "solid_grid", SolidGrid())
+    monkeypatch.setattr(game, "game_player", None)
+    return "test"
+
+
+def filed_at(actor, layer, x, y):
+    return actor in game.actor_index[layer].hash.query(pygame.Rect(x, y, 1, 1))
+
+
+def test_pooled_actor_is_filed_where_it_respawns(layer):
+    bullet = spawn(Bullet, 0, 0, [0, 0], layer)
+    destroy(bullet)
+    remove_destroyed()
+    assert not filed_at(bullet, layer, 0, 0)
+
+    again = spawn(Bullet, 1000, 1000, [0, 0], layer)
+    assert again is bullet
+    assert filed_at(again, layer, 1000, 1000)
+    assert not filed_at(again, layer, 0, 0)
+
+
+def test_actor_moved_by_a_contact_is_refiled(layer, monkeypatch):
+    def push(a, b):
+        b.x = b.y = 1000
+        b.shape.topleft = b.x, b.y
+
+    monkeypatch.setattr(collisions, "contact_handlers", [(PROJECTILE, PROJECTILE, push)])
+    monkeypatch.setattr(collisions, "interests", {})
+    monkeypatch.setattr(game, "game_player", spawn(Bullet, 0, 0, [0, 0], layer))
+    pushed = spawn(Bullet, 2, 0, [0, 0], layer)
+
+    game_update()
+
+    moved = [i for i in game.actor[layer] if i.x == 1000]
+    assert len(moved) == 1
+    assert filed_at(moved[0], layer, 1000, 1000)
+    assert not filed_at(moved[0], layer, 0, 0)
+
+
+def test_deactivated_solids_stop_colliding(layer):
+    block = spawn(HorizontallyMovingBlock, 100, 100, None, layer)
+    probe = pygame.Rect(block.shape.center, (1, 1))
+    assert game.solid_grid.collide(probe)
+
+    deactivate(block)
+    assert not game.solid_grid.collide(probe)
+    activate(block)
+    assert game.solid_grid.collide(probe)
+
+    destroy(block)
+    remove_destroyed()
+    assert game.solid_grid.dynamic == []
+
+
+def test_prewarming_the_player_keeps_the_live_one(layer):
+    tux = spawn(Tux, 160, 160, None, layer)
+    assert game.game_player is tux
+
+    prewarm(Tux, 3)
+    assert game.game_player is tux
+
+    # spawning one from the pool makes it the player
+    again = spawn(Tux, 0, 0, None, layer)
+    assert len(game.unused_actors[Tux]) == 2
+    assert game.game_player is again
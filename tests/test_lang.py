@@ -0,0 +1,169 @@
+import json
+import os
+import random
+
+import pytest
+
+import src.lang
+from src.lang import (
+    Catalog,
+    CatalogFormatError,
+    Localization,
+    MemoryCatalog,
+    compile_catalog,
+    is_fresh,
+    open_catalog,
+)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+    return str(path)
+
+
+@pytest.fixture
+def lang_dir(tmp_path):
+    languages = [["en", "English"], ["fr", "Français"], ["de", "Deutsch"]]
+    write_json(tmp_path / "languages.json", {"languages": languages})
+    write_json(
+        tmp_path / "en.json",
+        {"menu.play": "Play", "menu.exit": "Exit", "menu.title": "Dim Trouble"},
+    )
+    write_json(tmp_path / "fr.json", {"menu.play": "Jouer", "menu.exit": "Quitter"})
+    # de has no strings file
+    return tmp_path
+
+
+def localization(lang_dir):
+    return Localization(
+        str(lang_dir / "languages.json"), str(lang_dir), str(lang_dir / "compiled")
+    )
+
+
+class Cache:
+    def __init__(self):
+        self.cleared = 0
+
+    def cache_clear(self):
+        self.cleared += 1
+
+
+def test_lookup_matches_dict(tmp_path):
+    rng = random.Random(0)
+    alphabet = "abcz.é_0 ü"
+    strings = {
+        "".join(rng.choices(alphabet, k=rng.randint(1, 12))): "".join(
+            rng.choices(alphabet + "\n", k=rng.randint(0, 20))
+        )
+        for _ in range(500)
+    }
+    source = write_json(tmp_path / "xx.json", strings)
+
+    catalog = Catalog(compile_catalog(source, str(tmp_path / "xx.dtl")))
+
+    assert len(catalog) == len(strings)
+    for key, value in strings.items():
+        assert catalog.get(key) == value
+    for _ in range(500):
+        key = "".join(rng.choices(alphabet, k=rng.randint(0, 12)))
+        assert catalog.get(key) == strings.get(key)
+    catalog.close()
+
+
+def test_empty_catalog(tmp_path):
+    source = write_json(tmp_path / "xx.json", {})
+    catalog = Catalog(compile_catalog(source, str(tmp_path / "xx.dtl")))
+
+    assert len(catalog) == 0
+    assert catalog.get("menu.play", "default") == "default"
+    assert "menu.play" not in catalog
+
+
+def test_not_a_catalog(tmp_path):
+    with pytest.raises(CatalogFormatError):
+        source = write_json(tmp_path / "xx.json", {"key": 1})
+        compile_catalog(source, str(tmp_path / "xx.dtl"))
+
+    path = tmp_path / "xx.dtl"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(CatalogFormatError):
+        Catalog(str(path))
+
+
+def test_is_fresh(tmp_path):
+    source = write_json(tmp_path / "xx.json", {"a": "b"})
+    out_path = compile_catalog(source, str(tmp_path / "xx.dtl"))
+    assert is_fresh(source, out_path)
+
+    write_json(source, {"a": "c", "d": "e"})
+    assert not is_fresh(source, out_path)
+    assert not is_fresh(source, str(tmp_path / "missing.dtl"))
+
+
+def test_recompile_after_close(lang_dir):
+    catalog = open_catalog("fr", str(lang_dir), str(lang_dir / "compiled"))
+    assert catalog.get("menu.exit") == "Quitter"
+    catalog.close()
+    assert catalog.get("menu.play") is None
+
+    write_json(lang_dir / "fr.json", {"menu.play": "Jouez"})
+    updated = open_catalog("fr", str(lang_dir), str(lang_dir / "compiled"))
+    assert updated.get("menu.play") == "Jouez"
+    updated.close()
+
+
+def test_import_picks_no_language():
+    # the game picks it at startup, see main.py
+    assert src.lang.lang.language is None
+    assert src.lang.lang.catalog is None
+
+
+def test_read_only_falls_back_to_memory(lang_dir):
+    # somewhere a directory can't be made
+    (lang_dir / "compiled").write_text("")
+    catalog = open_catalog("fr", str(lang_dir), str(lang_dir / "compiled" / "sub"))
+
+    assert isinstance(catalog, MemoryCatalog)
+    assert catalog.get("menu.play") == "Jouer"
+
+
+def test_no_strings_file(lang_dir):
+    assert open_catalog("de", str(lang_dir), str(lang_dir / "compiled")) is None
+
+
+def test_localization(lang_dir):
+    lang = localization(lang_dir)
+    cache = lang.register_cache(Cache())
+    assert lang.languages["fr"] == "Français"
+
+    assert lang.tr("menu.play") == "menu.play"
+    assert lang.tr("menu.play", "Play!") == "Play!"
+
+    lang.use(lang.default)
+    assert lang.language == "en"
+    assert lang.tr("menu.play") == "Play"
+    assert cache.cleared == 1
+
+    lang.use("fr")
+    assert lang.tr("menu.play") == "Jouer"
+    # missing in fr, found in the default language
+    assert lang.tr("menu.title") == "Dim Trouble"
+    assert lang.tr("menu.missing", "fallback") == "fallback"
+    assert cache.cleared == 2
+
+    lang.use("fr")
+    assert cache.cleared == 2
+
+    lang.use("de")
+    assert lang.catalog is None
+    assert lang.tr("menu.play") == "Play"
+
+    lang.use("en")
+    assert lang.fallback is None
+    assert lang.tr("menu.exit") == "Exit"
+    assert cache.cleared == 4
+
+    with pytest.raises(ValueError):
+        lang.use("xx")
+    assert sorted(os.listdir(lang_dir / "compiled")) == ["en.dtl", "fr.dtl"]
@@ -0,0 +1,101 @@
+import json
+import os
+
+import numpy
+import pytest
+
+from src.mapfile import compile_map, is_fresh, load_json, load_map, read_map
+
+
+MAP = "res/map/test_for_PGE.json"
+
+
+def as_lists(mapdata):
+    """`mapdata` with its numpy tile arrays turned back into lists."""
+    return json.loads(
+        json.dumps(mapdata, default=lambda i: i.tolist() if isinstance(i, numpy.ndarray) else i)
+    )
+
+
+def infinite_map(path):
+    # two chunks of a tile layer, one left of and above the origin, and a
+    # GID with Tiled's flip flag set, which doesn't fit 16 bits
+    chunk = {"width": 2, "height": 2}
+    mapdata = {
+        "infinite": True,
+        "tilewidth": 16,
+        "tileheight": 16,
+        "tilesets": [],
+        "layers": [
+            {
+                "name": "BG",
+                "type": "tilelayer",
+                "startx": -2,
+                "starty": -2,
+                "width": 4,
+                "height": 4,
+                "chunks": [
+                    dict(chunk, x=-2, y=-2, data=[1, 2, 3, 4]),
+                    dict(chunk, x=0, y=0, data=[0, 0x80000005, 6, 7]),
+                ],
+            },
+            {"name": "objects", "type": "objectgroup", "objects": [{"id": 1, "x": 5}]},
+        ],
+    }
+    with open(path, "w") as file:
+        json.dump(mapdata, file)
+    return mapdata
+
+
+@pytest.mark.parametrize("memory_map", [False, True])
+def test_round_trip(tmp_path, memory_map):
+    out_path = compile_map(MAP, str(tmp_path / "map.dtm"))
+    compiled = read_map(out_path, memory_map)
+
+    assert as_lists(compiled) == load_json(MAP)
+    for layer in compiled["layers"]:
+        if "data" in layer:
+            assert isinstance(layer["data"], numpy.ndarray)
+            assert layer["data"].dtype == numpy.dtype("<u2")
+
+
+@pytest.mark.parametrize("memory_map", [False, True])
+def test_round_trip_infinite(tmp_path, memory_map):
+    source = str(tmp_path / "infinite.json")
+    mapdata = infinite_map(source)
+
+    compiled = read_map(compile_map(source, str(tmp_path / "infinite.dtm")), memory_map)
+
+    assert as_lists(compiled) == mapdata
+    chunks = compiled["layers"][0]["chunks"]
+    assert chunks[0]["data"].dtype == numpy.dtype("<u2")
+    assert chunks[1]["data"].dtype == numpy.dtype("<u4")
+
+
+def test_is_fresh(tmp_path):
+    source = str(tmp_path / "infinite.json")
+    infinite_map(source)
+    out_path = compile_map(source, str(tmp_path / "infinite.dtm"))
+    assert is_fresh(source, out_path)
+
+    with open(source, "a") as file:
+        file.write(" ")
+    assert not is_fresh(source, out_path)
+    assert not is_fresh(source, str(tmp_path / "missing.dtm"))
+
+    with open(out_path, "wb") as file:
+        file.write(b"garbage")
+    assert not is_fresh(source, out_path)
+
+
+def test_load_map_compiles_once(tmp_path):
+    source = str(tmp_path / "infinite.json")
+    mapdata = infinite_map(source)
+    compiled_dir = str(tmp_path / "compiled")
+
+    assert as_lists(load_map(source, compiled_dir)) == mapdata
+    out_path = os.path.join(compiled_dir, "infinite.dtm")
+    mtime = os.stat(out_path).st_mtime_ns
+
+    assert as_lists(load_map(source, compiled_dir)) == mapdata
+    assert os.stat(out_path).st_mtime_ns == mtime
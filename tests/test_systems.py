@@ -0,0 +1,65 @@
+import random
+
+import numpy
+import pygame
+import pytest
+
+from src.actors import GameMap, HorizontallyMovingBlock, Slime, Tux
+from src.game import game, new_actor, update_camera
+from src.systems import SlimeSystem, rect_assign, rect_coord
+
+
+@pytest.fixture(scope="module")
+def world():
+    game_map = GameMap("res/map/test_for_PGE.json")
+    game_map.draw_tiles()
+    new_actor(Tux, 160, 160, None, "actorlayer")
+    # a solid actor, so the moves are also checked against dynamic solids
+    new_actor(HorizontallyMovingBlock, 400, 300, None, "actorlayer")
+    update_camera()
+    return game_map
+
+
+def free_slimes(count, seed):
+    rng = random.Random(seed)
+    slimes = []
+    while len(slimes) < count:
+        x, y = rng.uniform(0, 1500), rng.uniform(0, 1500)
+        if not game.solid_grid.collide(pygame.Rect(x, y, 16, 16)):
+            slimes.append(Slime(x, y))
+    return slimes
+
+
+def state(slime):
+    return (
+        slime.x,
+        slime.y,
+        slime.xspeed,
+        slime.yspeed,
+        tuple(slime.shape),
+        slime.frame_index,
+    )
+
+
+@pytest.mark.parametrize("value", [0.0, 0.4, 0.5, 1.5, 2.5, -0.4, -0.5, -1.5, -2.7])
+def test_rect_rounding_matches_pygame(value):
+    values = numpy.array([value])
+    assert rect_coord(values)[0] == pygame.Rect(value, 0, 1, 1).x
+
+    rect = pygame.Rect(0, 0, 1, 1)
+    rect.x = value
+    assert rect_assign(values)[0] == rect.x
+
+
+def test_vectorized_step_matches_slime_run(world):
+    scalar = free_slimes(300, seed=1)
+    vector = free_slimes(300, seed=1)
+    system = SlimeSystem()
+    assert len(vector) >= system.MIN_BATCH
+
+    for _ in range(200):
+        for slime in scalar:
+            slime.run()
+        system.run(vector)
+
+    assert [state(i) for i in vector] == [state(i) for i in scalar]
@@ -0,0 +1,115 @@
+import random
+
+import pygame
+import pytest
+
+import src.globals
+from src.text import TextLayoutError, layout_text
+from src.utils import draw_text, get_font
+
+
+class MonoFont:
+    """Just the font methods `layout_text` uses, `advance` px per character."""
+
+    def __init__(self, advance=6, height=8):
+        self.advance = advance
+        self.height = height
+
+    def size(self, text):
+        return len(text) * self.advance, self.height
+
+    def get_height(self):
+        return self.height
+
+
+FONT = MonoFont()
+
+
+def greedy(text, font, max_width):
+    """Wrap `text` the obvious way: try each word on the current line."""
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and font.size(candidate)[0] > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def random_text(rng):
+    words = ["".join(rng.choices("abcdefgh", k=rng.randint(1, 8))) for _ in range(60)]
+    separators = [" "] * 12 + ["  ", "\t", "\n", "\n\n"]
+    return "".join(word + rng.choice(separators) for word in words)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_greedy_wrap(seed):
+    rng = random.Random(seed)
+    text = random_text(rng)
+    max_width = rng.randint(8, 40) * FONT.advance
+
+    layout = layout_text(text, FONT, max_width)
+
+    assert layout.lines == greedy(text, FONT, max_width)
+    assert layout.widths == [FONT.size(i)[0] for i in layout.lines]
+    assert all(width <= max_width for width in layout.widths)
+    assert layout.height == len(layout.lines) * FONT.height
+
+
+def test_spans_point_into_the_text():
+    text = "one  two\tthree\n\nfour five six"
+    layout = layout_text(text, FONT, 10 * FONT.advance)
+
+    assert layout.lines == ["one two", "three", "", "four five", "six"]
+    for line, (start, end) in zip(layout.lines, layout.spans):
+        assert " ".join(text[start:end].split()) == line
+
+
+def test_rewrap_to_another_width():
+    text = "the quick brown fox jumps over the lazy dog"
+
+    assert layout_text(text, FONT, 20 * FONT.advance).lines == [
+        "the quick brown fox",
+        "jumps over the lazy",
+        "dog",
+    ]
+    assert layout_text(text, FONT, 9 * FONT.advance).lines == [
+        "the quick",
+        "brown fox",
+        "jumps",
+        "over the",
+        "lazy dog",
+    ]
+
+
+def test_word_too_wide():
+    with pytest.raises(TextLayoutError, match="unbreakable"):
+        layout_text("an unbreakable word", FONT, 5 * FONT.advance)
+
+
+def test_too_tall():
+    text = "one two three"
+    assert len(layout_text(text, FONT, 5 * FONT.advance, 3 * FONT.height)) == 3
+    with pytest.raises(TextLayoutError):
+        layout_text(text, FONT, 5 * FONT.advance, 2 * FONT.height)
+
+
+@pytest.mark.parametrize(
+    "color", [pygame.Color(250, 200, 10), [250, 200, 10], (250, 200, 10, 255), "0xfac80a"]
+)
+def test_draw_text_color_types(color):
+    display = src.globals.display
+    font = get_font(8)
+    display.fill((0, 0, 0))
+    draw_text(font, 0, 0, "Ab", color)
+    drawn = pygame.Surface(font.size("Ab"))
+    drawn.blit(display, (0, 0))
+
+    expected = pygame.Surface(font.size("Ab"))
+    expected.blit(font.render("Ab", True, (250, 200, 10)), (0, 0))
+    assert pygame.image.tobytes(drawn, "RGB") == pygame.image.tobytes(expected, "RGB")
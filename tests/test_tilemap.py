@@ -0,0 +1,159 @@
+import glob
+import json
+import random
+
+import numpy
+import pygame
+import pytest
+
+from src.actors import GameMap, ObjectLayer, Slime
+from src.game import game
+from src.spatial import ChunkedSolidGrid, SolidGrid
+from src.tilemap import CHUNK_SIZE, LayerChunks, layer_chunks, layer_grid
+
+
+MAP = "res/map/test_for_PGE.json"
+
+
+def infinite_copy(path, tiled_chunk, offset, objects=()):
+    """`MAP` as an infinite map in Tiled chunks of `tiled_chunk` tiles,
+    moved by `offset` tiles, with `objects` in its object layer."""
+    with open(MAP) as file:
+        mapdata = json.load(file)
+    mapdata["infinite"] = True
+
+    for layer in mapdata["layers"]:
+        if layer["type"] == "objectgroup":
+            layer["objects"] = list(objects)
+            continue
+
+        grid = numpy.array(layer.pop("data")).reshape(layer["height"], layer["width"])
+        layer["chunks"] = []
+        for y in range(0, grid.shape[0], tiled_chunk):
+            for x in range(0, grid.shape[1], tiled_chunk):
+                data = numpy.zeros((tiled_chunk, tiled_chunk), int)
+                block = grid[y : y + tiled_chunk, x : x + tiled_chunk]
+                data[: block.shape[0], : block.shape[1]] = block
+                if data.any():
+                    layer["chunks"].append(
+                        {
+                            "data": data.ravel().tolist(),
+                            "x": x + offset,
+                            "y": y + offset,
+                            "width": tiled_chunk,
+                            "height": tiled_chunk,
+                        }
+                    )
+        layer["startx"] = layer["starty"] = offset
+
+    with open(path, "w") as file:
+        json.dump(mapdata, file)
+    return str(path)
+
+
+def solid_layer(mapdata):
+    return next(i for i in mapdata["layers"] if i["name"] == "solid")
+
+
+def random_rects(rng, count, bounds):
+    left, top, right, bottom = bounds
+    return [
+        pygame.Rect(
+            rng.randint(left, right),
+            rng.randint(top, bottom),
+            rng.randint(1, 40),
+            rng.randint(1, 40),
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob("res/map/*.json")))
+def test_every_map_loads(path):
+    game_map = GameMap(path)
+
+    for layer in game_map.mapdata["layers"]:
+        if layer["type"] != "tilelayer":
+            continue
+        grid = layer_grid(layer)[0]
+        for gid in numpy.unique(grid[grid != 0]):
+            image, area = game_map.tilesets.get(int(gid))
+            assert image is not None and area is not None, f"{layer['name']}: {gid}"
+
+
+@pytest.mark.parametrize("tiled_chunk, offset", [(None, 0), (16, 0), (8, -13), (10, 5)])
+def test_layer_chunks_match_split(tmp_path, tiled_chunk, offset):
+    path = MAP
+    if tiled_chunk is not None:
+        path = infinite_copy(tmp_path / "map.json", tiled_chunk, offset)
+    for layer in GameMap(path).mapdata["layers"]:
+        if layer["type"] != "tilelayer":
+            continue
+
+        chunks = layer_chunks(layer)
+        lazy = LayerChunks(layer)
+        keys = {(x, y) for x in range(-3, 8) for y in range(-3, 8)} | set(chunks)
+        for key in keys:
+            expected = chunks.get(key)
+            if expected is None:
+                assert lazy.get(key) is None, key
+            else:
+                assert numpy.array_equal(lazy.get(key), expected), key
+
+
+@pytest.mark.parametrize("tiled_chunk, offset", [(None, 0), (16, -16), (10, 5)])
+def test_chunked_solid_grid_matches_solid_grid(tmp_path, tiled_chunk, offset):
+    path = MAP
+    if tiled_chunk is not None:
+        path = infinite_copy(tmp_path / "map.json", tiled_chunk, offset)
+    game_map = GameMap(path)
+    layer = solid_layer(game_map.mapdata)
+    grid, x, y = layer_grid(layer)
+    full = SolidGrid.from_layer(
+        grid, grid.shape[1], grid.shape[0], game_map.tilesets.firstgids, 16, 16, x, y
+    )
+    # small enough that the queries keep dropping and rebuilding chunks
+    chunked = ChunkedSolidGrid(LayerChunks(layer), game_map.tilesets.firstgids, max_chunks=4)
+
+    rng = random.Random(offset)
+    bounds = (x * 16 - 64, y * 16 - 64, (x + grid.shape[1]) * 16, (y + grid.shape[0]) * 16)
+    rects = random_rects(rng, 500, bounds)
+    for rect in rects:
+        assert chunked.collide(rect) == full.collide(rect), rect
+        assert sorted(chunked.solid_rects(rect)) == sorted(full.solid_rects(rect)), rect
+    assert len(chunked.chunks) <= 4
+
+    left, top, w, h = (numpy.array([getattr(i, k) for i in rects]) for k in "xywh")
+    assert (chunked.collide_many(left, top, w, h) == full.collide_many(left, top, w, h)).all()
+    assert full.collide_many(left, top, w, h).any()
+
+
+def test_streamed_map_spawns_objects_near_the_camera(tmp_path):
+    chunk_px = 16 * CHUNK_SIZE
+    objects = [
+        {"id": i, "type": "Slime", "x": x, "y": 100, "width": 16, "height": 16}
+        for i, x in enumerate(range(0, 20 * chunk_px, chunk_px))
+    ]
+    game_map = GameMap(infinite_copy(tmp_path / "map.json", 16, 0, objects))
+    assert game_map.streaming
+    game_map.draw_tiles()
+    assert isinstance(game.solid_grid, ChunkedSolidGrid)
+
+    def slimes():
+        return sorted(a.x for a in game.actor["actorlayer"] if isinstance(a, Slime))
+
+    assert slimes() == []
+    (object_layer,) = game.actor["actorlayer"]
+    assert isinstance(object_layer, ObjectLayer)
+
+    game.cam_x, game.cam_y = 0, 0
+    object_layer.run()
+    # the view and one chunk around it
+    assert slimes() == [0, chunk_px, 2 * chunk_px]
+
+    game.cam_x = 10 * chunk_px
+    object_layer.run()
+    object_layer.run()
+    assert slimes() == [0, chunk_px, 2 * chunk_px] + [
+        x * chunk_px for x in range(9, 13)
+    ]